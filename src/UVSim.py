@@ -1,11 +1,27 @@
-from memory_structure import UVSimMemory
+import time
+from memory_structure import MEMORY_SIZE, UVSimMemory
 from operations import InputOutputOps, LoadStoreOps, ArithmeticOps, ControlOps
+from block_compiler import BlockCompiler
+from journal import ExecutionJournal
+from profiler import Profiler
+from cycle_detection import CycleDetector
+from breakpoints import parse_condition
+from io_channels import InputPending, make_input, make_output
+from format_inference import infer_format
 
 # Updates to UVSim class to support both 4-digit and 6-digit formats
 
+# Trace levels for run_until_halt
+TRACE_OFF = 0  # no messages are built
+TRACE_IO = 1  # READ and WRITE messages only
+TRACE_FULL = 2  # one message per instruction
+
+TIME_CHECK_STEPS = 10000  # steps between clock reads when run_until_halt has a time limit
+ASYNC_CHUNK_STEPS = 1000  # steps run_async runs before yielding to the event loop
+
 class UVSim:
-    def __init__(self):
-        self.memory = UVSimMemory()
+    def __init__(self, memory_size=MEMORY_SIZE, sparse=None):
+        self.memory = UVSimMemory(memory_size, sparse)
         self.inputoutput = InputOutputOps(self.memory)
         self.loadstore = LoadStoreOps(self.memory)
         self.arithmetic = ArithmeticOps(self.memory)
@@ -16,108 +32,660 @@ class UVSim:
         self.opcode = 0
         self.operand = 0
         self.format = "6-digit"  # Default to new format
+        self.trace_level = TRACE_OFF
+        self.inputs = None  # InputProvider READ takes values from during run_until_halt
+        self.outputs = []  # every value written by WRITE
+        self.saved_outputs = None  # SavedOutputs of the last snapshot or restore
+        self.outputs_kept = 0  # leading outputs still equal to saved_outputs
+        self.compiler = None  # BlockCompiler while compiled execution is enabled
+        self.journal = None  # ExecutionJournal while reverse stepping is enabled
+        self.profiler = None  # Profiler while profiling is enabled
+        self.breakpoints = {}  # address -> Condition on the accumulator, or None to always stop
+        self.watchpoints = set()  # addresses whose writes stop a run
+        # Dispatch table used in place of an if/elif chain over the opcode
+        self.handlers = {
+            10: self._read, 11: self._write,
+            20: self._load, 21: self._store,
+            30: self._add, 31: self._subtract, 32: self._divide, 33: self._multiply,
+            40: self._branch, 41: self._branch_neg, 42: self._branch_zero, 43: self._halt,
+        }
+        # Same table for instructions whose operand was checked against the memory
+        # size at decode time, so they can use the unchecked memory accessors
+        self.fast_handlers = dict(self.handlers)
+        self.fast_handlers.update({
+            11: self._fast_write,
+            20: self._fast_load, 21: self._fast_store,
+            30: self._fast_add, 31: self._fast_subtract, 32: self._fast_divide, 33: self._fast_multiply,
+        })
 
     def set_format(self, format_type):
         """Set the instruction format to '4-digit' or '6-digit'"""
         if format_type in ["4-digit", "6-digit"]:
+            changed = format_type != self.format
             self.format = format_type
+            if changed:
+                self.memory.clear_decoded()
+                if self.compiler is not None:
+                    self.compiler.invalidate_all()
         else:
             raise ValueError("Format must be either '4-digit' or '6-digit'")
 
-    def load_program(self, program):
+    def load_program(self, program, file_format=None):
+        """
+        Load program from address 0 in file_format, or in the format
+        inferred from its words (see format_inference) when none is given.
+        """
         self.memory.load_program(program)
-        
-        # Try to detect format if not already set
-        if len(program) > 0:
-            # Check if any instruction exceeds 4-digit range
-            if any(abs(instr) > 9999 for instr in program):
-                self.format = "6-digit"
-            else:
-                # Check opcode range (in 6-digit, opcodes can be 10-43)
-                # In 4-digit, they'd be represented as 10-43 in the tens/hundreds place
-                has_6digit_opcode = any((instr // 1000) in range(10, 44) for instr in program)
-                if has_6digit_opcode:
-                    self.format = "6-digit"
-                else:
-                    self.format = "4-digit"
+        if self.journal is not None:
+            self.journal.clear()
 
+        if file_format is None:
+            file_format = infer_format(program).format  # None for an empty program keeps the format
+        if file_format is not None:
+            self.set_format(file_format)
 
+        self.decode_program()
 
+    def reset(self, program_counter=0):
+        """
+        Clear registers, outputs and the journal for a new program, e.g. one
+        written straight into memory, keeping memory and the format.
+        """
+        self.accumulator = 0
+        self.program_counter = program_counter
+        self.instruction_register = 0
+        self.opcode = 0
+        self.operand = 0
+        self.outputs.clear()  # in place, compiled blocks hold outputs.append
+        self.outputs_kept = 0
+        if self.journal is not None:
+            self.journal.clear()  # its steps lead to the previous program
+        if self.profiler is not None:
+            self.profiler.reset()
 
-    def run(self, value=None):
-        self.instruction_register = self.memory.get_value(self.program_counter)
-        
-        if self.instruction_register == 0:
-            raise ValueError("Empty instruction (0) encountered")
-            
+    def use_compiler(self, enabled=True):
+        """
+        Turn compiled execution on or off. When on, run_until_halt without
+        tracing runs basic blocks translated to Python instead of single
+        instructions.
+        """
+        if enabled and self.compiler is None:
+            self.compiler = BlockCompiler(self)
+        elif not enabled and self.compiler is not None:
+            self.compiler.detach()
+            self.compiler = None
+
+    def snapshot(self):
+        """
+        Save memory, registers, format and outputs. Memory pages are shared
+        with the previous snapshot unless they were written since, and only
+        the outputs written since are copied.
+        """
+        saved = self.saved_outputs
+        count = len(self.outputs)
+        if saved is None or not self.outputs_kept == len(saved) == count:
+            kept = self.outputs_kept if saved is not None else 0
+            saved = self.saved_outputs = SavedOutputs(saved, kept, tuple(self.outputs[kept:]))
+            self.outputs_kept = count
+        return Snapshot(self.memory.snapshot(), self.accumulator, self.program_counter,
+                        self.instruction_register, self.opcode, self.operand, self.format, saved)
+
+    def restore(self, snapshot):
+        """Return to the state saved by snapshot(), copying only pages that differ."""
+        self.set_format(snapshot.format)
+        self.memory.restore(snapshot.memory)
+        self.accumulator = snapshot.accumulator
+        self.program_counter = snapshot.program_counter
+        self.instruction_register = snapshot.instruction_register
+        self.opcode = snapshot.opcode
+        self.operand = snapshot.operand
+        self.outputs[:] = snapshot.outputs.values()  # in place, compiled blocks hold outputs.append
+        self.saved_outputs = snapshot.outputs
+        self.outputs_kept = len(self.outputs)
+        if self.journal is not None:
+            self.journal.clear()  # its steps lead to the state before the restore
+
+    def fork(self):
+        """
+        Return a new UVSim in the current state, e.g. to try other inputs from
+        here. The fork reads this VM's snapshot pages and copies a page only
+        when it first writes to it.
+        """
+        vm = UVSim(self.memory.size, self.memory.sparse)
+        vm.trace_level = self.trace_level
+        snapshot = self.snapshot()
+        vm.memory.share(snapshot.memory)
+        vm.restore(snapshot)
+        if self.compiler is not None:
+            vm.use_compiler()
+        return vm
+
+    def enable_journal(self, capacity=10000):
+        """Record every executed instruction so it can be undone with step_back()."""
+        self.journal = ExecutionJournal(capacity, self.memory.size)
+
+    def enable_profiler(self):
+        """Start counting executed instructions; returns the new Profiler."""
+        self.profiler = Profiler(len(self.memory.memory))
+        return self.profiler
+
+    def set_breakpoint(self, address, condition=None):
+        """
+        Stop runs before the instruction at address, or only when condition
+        (a Condition or text such as "< 0") holds for the accumulator.
+        """
+        if not 0 <= address < len(self.memory.memory):
+            raise IndexError(f"Invalid memory address: {address}")
+        if isinstance(condition, str):
+            condition = parse_condition(condition)
+        self.breakpoints[address] = condition
+
+    def clear_breakpoint(self, address):
+        self.breakpoints.pop(address, None)
+
+    def set_watchpoint(self, address):
+        """Stop runs right after an instruction writes address."""
+        if not 0 <= address < len(self.memory.memory):
+            raise IndexError(f"Invalid memory address: {address}")
+        self.watchpoints.add(address)
+
+    def clear_watchpoint(self, address):
+        self.watchpoints.discard(address)
+
+    def clear_breakpoints(self):
+        """Remove every breakpoint and watchpoint."""
+        self.breakpoints.clear()
+        self.watchpoints.clear()
+
+    def breakpoint_hit(self, address):
+        """True when a breakpoint at address stops the run with the current accumulator."""
+        if address not in self.breakpoints:
+            return False
+        condition = self.breakpoints[address]
+        return condition is None or condition(self.accumulator)
+
+    def watchpoint_hit(self, opcode, operand):
+        """True when the executed instruction wrote a watched address."""
+        return opcode in (10, 21) and operand in self.watchpoints
+
+    def execute(self, entry, value=None):
+        """Run a fetched entry, recording it in the journal and profiler when they are on."""
+        word, opcode, operand, handler = entry
+        journal = self.journal
+        if journal is None and self.profiler is None:
+            return handler(operand, value)
+        program_counter, accumulator = self.program_counter, self.accumulator
+        address, old_value = -1, 0
+        if journal is not None and opcode in (10, 21) and operand < len(self.memory.memory):
+            address, old_value = operand, self.memory.memory[operand]  # READ and STORE write one cell
+        continue_exec = handler(operand, value)
+        if journal is not None:
+            journal.record(program_counter, accumulator, address, old_value)
+        if self.profiler is not None:
+            self.profiler.record(program_counter, opcode, self.program_counter)
+        return continue_exec
+
+    def step_back(self, count=1):
+        """Undo up to count journaled instructions and return how many were undone."""
+        undone = 0
+        while undone < count and self.journal is not None and len(self.journal):
+            program_counter, accumulator, address, old_value = self.journal.pop()
+            if address >= 0:
+                self.memory.set_value(address, old_value)
+            self.program_counter = program_counter
+            self.accumulator = accumulator
+            # Memory is now as it was, so the word at the program counter is the one undone
+            word, opcode, operand, handler = self.decode(program_counter)
+            if opcode == 11 and self.outputs:
+                self.outputs.pop()
+                self.outputs_kept = min(self.outputs_kept, len(self.outputs))
+            undone += 1
+        return undone
+
+    def step_back_to_write(self, address):
+        """
+        Undo back to just before the latest journaled write to address. Returns
+        the number of instructions undone, 0 when the journal holds no such write.
+        """
+        if self.journal is None:
+            return 0
+        distance = self.journal.steps_since_write(address)
+        if distance is None:
+            return 0
+        return self.step_back(distance)
+
+    def decode(self, address):
+        """
+        Split the word at address into opcode and operand and cache the result,
+        together with the handler for the opcode, in memory.decoded.
+        """
+        word = self.memory.get_value(address)
         if self.format == "4-digit":
-            self.opcode = self.instruction_register // 100
-            self.operand = self.instruction_register % 100
-        else:  # 6-digit
-            self.opcode = self.instruction_register // 1000
-            self.operand = self.instruction_register % 1000
-
-        # Validation
-        if self.opcode == 0 and self.instruction_register != 0:
-            raise ValueError(f"Instruction parsing failed. Raw: {self.instruction_register}, Format: {self.format}")
-
-        if self.opcode == 10:  # READ - Read a word from the keyboard into a location in memory
-            if value is None:
-                raise ValueError("No input provided for READ instruction.")
-            self.inputoutput.read(self.operand, value)
-            self.program_counter += 1
-            return f"READ: Stored {value:+05d} in memory[{self.operand}]", True
-        elif self.opcode == 11:  # WRITE - Write a word from a specific location in memory to screen
-            value = self.inputoutput.write(self.operand)
-            self.program_counter += 1
-            return f"WRITE: Memory[{self.operand}] = {value:+05d}", True
-        elif self.opcode == 20:  # LOAD - Load a word from a specific location in memory into the accumulator
-            self.accumulator = self.loadstore.load(self.operand)
-            self.program_counter += 1
-            return f"LOAD: Accumulator set to {self.accumulator:+05d}", True
-        elif self.opcode == 21:  # STORE - Store a word from the accumulator into a specific location in memory
-            self.loadstore.store(self.operand, self.accumulator)
-            self.program_counter += 1
-            return f"STORE: Memory[{self.operand}] set to {self.accumulator:+05d}", True
-        elif self.opcode == 30:  # ADD - Add a word from memory into the accumulator
-            self.accumulator = self.arithmetic.add(self.operand, self.accumulator)
-            self.program_counter += 1
-            return f"ADD: Accumulator updated to {self.accumulator:+05d}", True
-        elif self.opcode == 31:  # SUBTRACT - Subtract a word from memory from the accumulator
-            self.accumulator = self.arithmetic.subtract(self.operand, self.accumulator)
-            self.program_counter += 1
-            return f"SUBTRACT: Accumulator updated to {self.accumulator:+05d}", True
-        elif self.opcode == 32:  # DIVIDE - Divide the accumulator by a word in a specified location
-            self.accumulator = self.arithmetic.divide(self.operand, self.accumulator)
-            self.program_counter += 1
-            return f"DIVIDE: Accumulator updated to {self.accumulator:+05d}", True
-        elif self.opcode == 33:  # MULTIPLY - Multiply the accumulator by a word in the specified location
-            self.accumulator = self.arithmetic.multiply(self.operand, self.accumulator)
-            self.program_counter += 1
-            return f"MULTIPLY: Accumulator updated to {self.accumulator:+05d}", True
-        elif self.opcode == 40:  # BRANCH - Branch to a specific location in memory
-            self.program_counter = self.operand
-            return f"BRANCH: Jumping to address {self.operand:02d}", True
-        elif self.opcode == 41:  # BRANCHNEG - Branch to a specific location in memory if the accumulator is negative
+            opcode = word // 100
+            operand = word % 100
+        else:  # 6-digit, with wider operands in memories over 1000 words
+            opcode, operand = divmod(word, self.memory.operand_divisor)
+        handlers = self.fast_handlers if operand < len(self.memory.decoded) else self.handlers
+        entry = (word, opcode, operand, handlers.get(opcode))
+        self.memory.decoded[address] = entry
+        return entry
+
+    def decode_program(self):
+        """
+        Pre-decode every memory location for the current format. A sparse
+        memory only has its allocated pages decoded, the rest on first fetch.
+        """
+        for address in list(self.memory.used_addresses()):
+            self.decode(address)
+
+    def fetch(self):
+        """Return the decoded entry at the program counter, raising for words that cannot execute."""
+        try:
+            entry = self.memory.decoded[self.program_counter]
+        except IndexError:
+            entry = None
+        if entry is None:
+            entry = self.decode(self.program_counter)
+        if entry[3] is None:
+            word, opcode = entry[0], entry[1]
+            self.instruction_register, self.opcode, self.operand = word, opcode, entry[2]
+            if word == 0:
+                raise ValueError("Empty instruction (0) encountered")
+            # Validation
+            if opcode == 0:
+                raise ValueError(f"Instruction parsing failed. Raw: {word}, Format: {self.format}")
+            raise ValueError(f"Unknown opcode: {opcode}")
+        return entry
+
+    def run(self, value=None):
+        entry = self.fetch()
+        self.instruction_register, self.opcode, self.operand = entry[0], entry[1], entry[2]
+        continue_exec = self.execute(entry, value)
+        return self.describe(self.opcode, self.operand), continue_exec
+
+    def run_until_halt(self, inputs=None, max_steps=1000, trace_level=None, time_limit=None,
+                       detect_cycles=False, output=None):
+        """
+        Run from the current program counter until HALT, an error, max_steps
+        instructions or time_limit seconds, reading READ values from inputs
+        and passing WRITE values to output when the run returns (see
+        io_channels for the sources and targets accepted).
+        Trace messages are only built when trace_level (default
+        self.trace_level) is above TRACE_OFF. With detect_cycles the run stops
+        as soon as its state repeats, see CycleDetector. Breakpoints stop the
+        run before their instruction (except the first one run, so a stopped
+        run can be resumed) and watchpoints right after a write; only runs
+        with some set pay for checking them.
+        """
+        if trace_level is None:
+            trace_level = self.trace_level
+        self.inputs = make_input(inputs)
+        result = RunResult()
+        first_output = len(self.outputs)
+        fetch = self.fetch
+        decoded = self.memory.decoded
+        detector = CycleDetector() if detect_cycles else None
+        deadline = time.monotonic() + time_limit if time_limit is not None else None
+        # Without a deadline the loops run straight to max_steps, otherwise the
+        # clock is read every TIME_CHECK_STEPS steps
+        limit = max_steps if deadline is None else min(max_steps, TIME_CHECK_STEPS)
+        entry = None
+        steps = 0
+        try:
+            breakpoints, watchpoints = self.breakpoints, self.watchpoints
+            instrumented = (self.journal is not None or self.profiler is not None or detector is not None
+                            or bool(breakpoints) or bool(watchpoints))
+            while True:
+                if trace_level == TRACE_OFF and self.compiler is not None and not instrumented:
+                    blocks = self.compiler.blocks
+                    lookup = self.compiler.lookup
+                    while steps < limit:
+                        block = blocks.get(self.program_counter) or lookup(self.program_counter)
+                        if block is not None and block.length <= limit - steps:
+                            executed, self.program_counter = block.function(self, limit - steps)
+                            steps += executed
+                            if executed:
+                                continue
+                        # READ, HALT, errors and a block bailing out run on the interpreter
+                        entry = decoded[self.program_counter] if self.program_counter < len(decoded) else None
+                        if entry is None or entry[3] is None:
+                            entry = fetch()
+                        continue_exec = entry[3](entry[2], None)
+                        steps += 1
+                        if not continue_exec:
+                            result.halted = True
+                            break
+                elif trace_level == TRACE_OFF and not instrumented:
+                    while steps < limit:
+                        entry = decoded[self.program_counter] if self.program_counter < len(decoded) else None
+                        if entry is None or entry[3] is None:
+                            entry = fetch()
+                        continue_exec = entry[3](entry[2], None)
+                        steps += 1
+                        if not continue_exec:
+                            result.halted = True
+                            break
+                else:
+                    # Tracing, journaling, profiling, cycle detection or
+                    # breakpoints, every instruction goes through execute()
+                    trace = result.trace
+                    execute = self.execute
+                    while steps < limit:
+                        address = self.program_counter
+                        if breakpoints and steps and self.breakpoint_hit(address):
+                            result.breakpoint = address
+                            break
+                        entry = fetch()
+                        continue_exec = execute(entry, None)
+                        steps += 1
+                        if trace_level >= TRACE_FULL or (trace_level >= TRACE_IO and entry[1] in (10, 11)):
+                            trace.append(self.describe(entry[1], entry[2]))
+                        if not continue_exec:
+                            result.halted = True
+                            break
+                        if detector is not None and detector.executed(self, entry[1], entry[2], address, steps):
+                            result.cycle = detector.cycle
+                            result.error = str(detector.cycle)
+                            break
+                        if watchpoints and self.watchpoint_hit(entry[1], entry[2]):
+                            result.watchpoint = entry[2]
+                            break
+
+                if (result.halted or result.cycle is not None or result.breakpoint is not None
+                        or result.watchpoint is not None or steps >= max_steps):
+                    break
+                if time.monotonic() >= deadline:
+                    result.timed_out = True
+                    result.error = f"Time limit of {time_limit:g} seconds reached."
+                    break
+                limit = min(max_steps, steps + TIME_CHECK_STEPS)
+        except (ValueError, IndexError, ZeroDivisionError) as e:
+            result.error = str(e)
+            result.needs_input = isinstance(e, InputPending)
+        finally:
+            self.inputs = None
+
+        if entry is not None:
+            self.instruction_register, self.opcode, self.operand = entry[0], entry[1], entry[2]
+        result.accumulator = self.accumulator
+        result.program_counter = self.program_counter
+        result.outputs = self.outputs[first_output:]
+        result.steps = steps
+        if output is not None:
+            sink = make_output(output)
+            for value in result.outputs:
+                sink.write(value)
+            if sink is not output:
+                sink.close()
+        return result
+
+    async def run_async(self, inputs=None, output=None, max_steps=1000, trace_level=None,
+                        chunk_steps=ASYNC_CHUNK_STEPS):
+        """
+        Coroutine version of run_until_halt, so one event loop can drive many
+        VMs. Runs chunk_steps instructions at a time, yielding to the loop
+        between chunks, and when READ finds no input ready it awaits the
+        input provider (e.g. an asyncio.Queue) instead of failing. WRITE
+        values reach output at the end of each chunk.
+        """
+        import asyncio  # only async callers pay for importing it
+        if trace_level is None:
+            trace_level = self.trace_level
+        provider = make_input(inputs)
+        sink = make_output(output)
+        total = RunResult()
+        first_output = len(self.outputs)
+        resumed = False  # only the first instruction of the whole run skips its breakpoint
+        try:
+            while total.steps < max_steps:
+                if resumed and self.breakpoints and self.breakpoint_hit(self.program_counter):
+                    total.breakpoint = self.program_counter
+                    break
+                resumed = True
+                result = self.run_until_halt(provider, min(chunk_steps, max_steps - total.steps), trace_level,
+                                             output=sink)
+                total.steps += result.steps
+                total.trace.extend(result.trace)
+                if result.needs_input:
+                    value = await provider.wait_value() if provider is not None else None
+                    if value is None:
+                        total.error, total.needs_input = result.error, True
+                        break
+                    try:
+                        message, continue_exec = self.run(value)
+                    except (ValueError, IndexError) as e:
+                        total.error = str(e)
+                        break
+                    total.steps += 1
+                    if trace_level >= TRACE_IO:
+                        total.trace.append(message)
+                    continue
+                if result.halted or result.error is not None or result.breakpoint is not None \
+                        or result.watchpoint is not None:
+                    total.halted, total.error = result.halted, result.error
+                    total.breakpoint, total.watchpoint = result.breakpoint, result.watchpoint
+                    break
+                await asyncio.sleep(0)  # let the other tasks on the loop run
+        finally:
+            if sink is not None and sink is not output:
+                sink.close()
+
+        total.accumulator = self.accumulator
+        total.program_counter = self.program_counter
+        total.outputs = self.outputs[first_output:]
+        return total
+
+    def describe(self, opcode, operand):
+        """Build the trace message for an instruction that has just executed."""
+        if opcode == 10:
+            return f"READ: Stored {self.memory.get_value(operand):+05d} in memory[{operand}]"
+        elif opcode == 11:
+            return f"WRITE: Memory[{operand}] = {self.memory.get_value(operand):+05d}"
+        elif opcode == 20:
+            return f"LOAD: Accumulator set to {self.accumulator:+05d}"
+        elif opcode == 21:
+            return f"STORE: Memory[{operand}] set to {self.accumulator:+05d}"
+        elif opcode == 30:
+            return f"ADD: Accumulator updated to {self.accumulator:+05d}"
+        elif opcode == 31:
+            return f"SUBTRACT: Accumulator updated to {self.accumulator:+05d}"
+        elif opcode == 32:
+            return f"DIVIDE: Accumulator updated to {self.accumulator:+05d}"
+        elif opcode == 33:
+            return f"MULTIPLY: Accumulator updated to {self.accumulator:+05d}"
+        elif opcode == 40:
+            return f"BRANCH: Jumping to address {operand:02d}"
+        elif opcode == 41:
             if self.accumulator < 0:
-                self.program_counter = self.operand
-                return f"BRANCHNEG: Accumulator negative, jumping to address {self.operand:02d}", True
-            else:
-                self.program_counter += 1
-                return "BRANCHNEG: Accumulator not negative, no branch.", True
-        elif self.opcode == 42:  # BRANCHZERO - Branch to a specific location in memory if the accumulator is zero
+                return f"BRANCHNEG: Accumulator negative, jumping to address {operand:02d}"
+            return "BRANCHNEG: Accumulator not negative, no branch."
+        elif opcode == 42:
             if self.accumulator == 0:
-                self.program_counter = self.operand
-                return f"BRANCHZERO: Accumulator zero, jumping to address {self.operand:02d}", True
-            else:
-                self.program_counter += 1
-                return "BRANCHZERO: Accumulator not zero, no branch.", True
-        elif self.opcode == 43:  # HALT - Pause the program
-            self.control.halt()
-            return "HALT: Program execution halted.", False
+                return f"BRANCHZERO: Accumulator zero, jumping to address {operand:02d}"
+            return "BRANCHZERO: Accumulator not zero, no branch."
+        elif opcode == 43:
+            return "HALT: Program execution halted."
+        return f"Unknown opcode: {opcode}"
+
+    def _read(self, operand, value):
+        # READ - Read a word from the keyboard into a location in memory
+        if value is None and self.inputs is not None:
+            value = self.inputs.next_value()
+        if value is None:
+            raise InputPending("No input provided for READ instruction.")
+        self.inputoutput.read(operand, value)
+        self.program_counter += 1
+        return True
+
+    def _write(self, operand, value):
+        # WRITE - Write a word from a specific location in memory to screen
+        self.outputs.append(self.inputoutput.write(operand))
+        self.program_counter += 1
+        return True
+
+    def _load(self, operand, value):
+        # LOAD - Load a word from a specific location in memory into the accumulator
+        self.accumulator = self.loadstore.load(operand)
+        self.program_counter += 1
+        return True
+
+    def _store(self, operand, value):
+        # STORE - Store a word from the accumulator into a specific location in memory
+        self.loadstore.store(operand, self.accumulator)
+        self.program_counter += 1
+        return True
+
+    def _add(self, operand, value):
+        # ADD - Add a word from memory into the accumulator
+        self.accumulator = self.arithmetic.add(operand, self.accumulator)
+        self.program_counter += 1
+        return True
+
+    def _subtract(self, operand, value):
+        # SUBTRACT - Subtract a word from memory from the accumulator
+        self.accumulator = self.arithmetic.subtract(operand, self.accumulator)
+        self.program_counter += 1
+        return True
+
+    def _divide(self, operand, value):
+        # DIVIDE - Divide the accumulator by a word in a specified location
+        self.accumulator = self.arithmetic.divide(operand, self.accumulator)
+        self.program_counter += 1
+        return True
+
+    def _multiply(self, operand, value):
+        # MULTIPLY - Multiply the accumulator by a word in the specified location
+        self.accumulator = self.arithmetic.multiply(operand, self.accumulator)
+        self.program_counter += 1
+        return True
+
+    def _fast_write(self, operand, value):
+        self.outputs.append(self.memory.memory[operand])
+        self.program_counter += 1
+        return True
+
+    def _fast_load(self, operand, value):
+        self.accumulator = self.memory.memory[operand]
+        self.program_counter += 1
+        return True
+
+    def _fast_store(self, operand, value):
+        self.memory.poke(operand, self.accumulator)
+        self.program_counter += 1
+        return True
+
+    def _fast_add(self, operand, value):
+        self.accumulator += self.memory.memory[operand]
+        self.program_counter += 1
+        return True
+
+    def _fast_subtract(self, operand, value):
+        self.accumulator -= self.memory.memory[operand]
+        self.program_counter += 1
+        return True
+
+    def _fast_divide(self, operand, value):
+        divisor = self.memory.memory[operand]
+        if divisor == 0:
+            raise ZeroDivisionError("Attempt to divide by zero.")
+        self.accumulator //= divisor
+        self.program_counter += 1
+        return True
+
+    def _fast_multiply(self, operand, value):
+        self.accumulator *= self.memory.memory[operand]
+        self.program_counter += 1
+        return True
+
+    def _branch(self, operand, value):
+        # BRANCH - Branch to a specific location in memory
+        self.program_counter = operand
+        return True
+
+    def _branch_neg(self, operand, value):
+        # BRANCHNEG - Branch to a specific location in memory if the accumulator is negative
+        if self.accumulator < 0:
+            self.program_counter = operand
+        else:
+            self.program_counter += 1
+        return True
+
+    def _branch_zero(self, operand, value):
+        # BRANCHZERO - Branch to a specific location in memory if the accumulator is zero
+        if self.accumulator == 0:
+            self.program_counter = operand
         else:
-            raise ValueError(f"Unknown opcode: {self.opcode}")
-            
+            self.program_counter += 1
+        return True
+
+    def _halt(self, operand, value):
+        # HALT - Pause the program
+        self.control.halt()
+        return False
+
+
+class Snapshot:
+    """VM state saved by UVSim.snapshot(); memory is a tuple of immutable pages."""
+
+    def __init__(self, memory, accumulator, program_counter, instruction_register, opcode, operand,
+                 format, outputs):
+        self.memory = memory
+        self.accumulator = accumulator
+        self.program_counter = program_counter
+        self.instruction_register = instruction_register
+        self.opcode = opcode
+        self.operand = operand
+        self.format = format
+        self.outputs = outputs
+
+
+class SavedOutputs:
+    """
+    Outputs saved by a snapshot: the first count values of an earlier
+    snapshot's SavedOutputs followed by the values written since, so a
+    snapshot only copies the outputs that are new to it.
+    """
+
+    def __init__(self, previous, count, new):
+        self.previous = previous  # SavedOutputs holding the first count values, or None
+        self.count = count
+        self.new = new  # tuple of the values after those
+        self.length = count + len(new)
+
+    def __len__(self):
+        return self.length
+
+    def values(self):
+        """All saved values as a list."""
+        chunks = []
+        node, length = self, self.length
+        while node is not None and length:
+            chunks.append(node.new[:max(0, length - node.count)])
+            length = min(length, node.count)
+            node = node.previous
+        values = []
+        for chunk in reversed(chunks):
+            values.extend(chunk)
+        return values
+
+
+class RunResult:
+    """Outcome of UVSim.run_until_halt."""
+
+    def __init__(self):
+        self.accumulator = 0
+        self.program_counter = 0
+        self.outputs = []  # values printed by WRITE, in order
+        self.steps = 0
+        self.halted = False  # True when the program reached HALT
+        self.error = None  # message of the error, time limit or loop that stopped the run, if any
+        self.timed_out = False  # True when the time limit stopped the run
+        self.cycle = None  # Cycle found when cycle detection stopped the run
+        self.breakpoint = None  # address of the breakpoint the run stopped at
+        self.watchpoint = None  # watched address whose write stopped the run
+        self.needs_input = False  # True when READ stopped the run for lack of input
+        self.trace = []  # trace messages, only filled when tracing is on
+
 if __name__ == "__main__":
     #Displays welcome message
     print("*** Welcome to UVSIM! ***")
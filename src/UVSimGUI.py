@@ -1,16 +1,21 @@
 import sys
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QTabWidget, QPushButton, QVBoxLayout,
-    QHBoxLayout, QWidget, QFileDialog
-)
-from color_scheme import ColorScheme
-from UVSimTab import UVSimTab
 import os
+from startup_timing import timer as startup_timer
+with startup_timer.phase("import PyQt5"):
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import (
+        QApplication, QMainWindow, QTabWidget, QPushButton, QVBoxLayout,
+        QHBoxLayout, QWidget, QFileDialog
+    )
+with startup_timer.phase("import simulator modules"):
+    from color_scheme import ColorScheme
+    from UVSimTab import UVSimTab
 
 class UVSimGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.color_scheme = ColorScheme()
+        self.color_scheme.apply()  # one application-wide stylesheet covers every tab
         self.initUI()
 
     def initUI(self):
@@ -46,27 +51,30 @@ class UVSimGUI(QMainWindow):
         # Add initial tab
         self.add_new_tab()
 
-    def add_new_tab(self):
+    def add_new_tab(self, current=True):
+        # A tab builds its widgets when it is first shown, so tabs opened in
+        # the background cost little until they are selected
         tab = UVSimTab(self.color_scheme)
         tab_count = self.tabs.count() + 1
         self.tabs.addTab(tab, f"Program {tab_count}")
-        self.tabs.setCurrentWidget(tab)
-        self.color_scheme.apply_color_scheme(tab)
+        if current:
+            self.tabs.setCurrentWidget(tab)
         return tab
 
     def load_file_to_new_tab(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Instructions File", "",
-            "Text Files (*.txt);;All Files (*)"
+        from file_functions import FILE_FILTER
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Select Instructions Files", "", FILE_FILTER
         )
-        if file_path:
-            tab = self.add_new_tab()
-            tab.file_path = file_path
-            tab.load_file()
-            self.tabs.setTabText(self.tabs.currentIndex(), os.path.basename(file_path))
+        # Only the last file's tab is shown, and built, right away
+        for number, file_path in enumerate(file_paths, start=1):
+            tab = self.add_new_tab(current=number == len(file_paths))
+            tab.load_file_path(file_path)
+            self.tabs.setTabText(self.tabs.indexOf(tab), os.path.basename(file_path))
 
     def close_tab(self, index):
         if self.tabs.count() > 1:
+            self.tabs.widget(index).stop_worker()
             self.tabs.removeTab(index)
         else:
             self.statusBar().showMessage("Cannot close the last tab.")
@@ -74,13 +82,27 @@ class UVSimGUI(QMainWindow):
     def configure_color_scheme(self):
         if self.tabs.count() > 0:
             current_tab = self.tabs.currentWidget()
-            self.color_scheme.configure_color_scheme(self, current_tab.console_output)
-            for i in range(self.tabs.count()):
-                tab = self.tabs.widget(i)
-                self.color_scheme.apply_color_scheme(tab)
+            self.color_scheme.configure_color_scheme(self, current_tab.console_log)
+
+    def closeEvent(self, event):
+        # Stop running programs so no worker thread outlives the window
+        for i in range(self.tabs.count()):
+            self.tabs.widget(i).stop_worker()
+        super().closeEvent(event)
+
+def report_startup():
+    startup_timer.finish()
+    print(startup_timer.report())
+
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = UVSimGUI()
-    window.show()
+    show_report = "--startup-report" in sys.argv or os.environ.get("UVSIM_STARTUP_REPORT") == "1"
+    with startup_timer.phase("create application"):
+        app = QApplication(sys.argv)
+    with startup_timer.phase("create main window"):
+        window = UVSimGUI()
+    with startup_timer.phase("show main window"):
+        window.show()
+    # Runs once the event loop has painted the first window
+    QTimer.singleShot(0, report_startup if show_report else startup_timer.finish)
     sys.exit(app.exec_())
@@ -1,47 +1,82 @@
 import sys
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTextEdit,
-    QLineEdit, QScrollArea, QInputDialog
+    QLineEdit, QInputDialog, QTableView, QHeaderView, QAbstractItemView,
+    QComboBox, QFileDialog, QSpinBox, QDoubleSpinBox, QCheckBox, QMessageBox, QMenu
 )
 from UVSim import UVSim
-from file_functions import load_instruction_file, save_instruction_file
+from memory_table_model import MemoryTableModel, MemoryItemDelegate
+from console_log import ConsoleLog, ERRORS, IO, TRACE, VERBOSITY_NAMES
+from format_inference import FormatInference
+from startup_timing import timer as startup_timer
 
 class UVSimTab(QWidget):
+    EDIT_TRIGGERS = QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed | QAbstractItemView.AnyKeyPressed
+
     def __init__(self, color_scheme, parent=None):
         super().__init__(parent)
         self.uvsim = UVSim()
+        self.journal_capacity = 10000  # instructions Step Back can undo
+        self.uvsim.enable_journal(self.journal_capacity)
+        self.loaded_snapshot = self.uvsim.snapshot()  # state Reset returns to, updated when a file is loaded
+        self.loaded_format_fixed = False  # whether the format was fixed in that state (by a file)
         self.color_scheme = color_scheme
         self.file_path = None  # Track associated file
         self.file_format = "6-digit"  # Default to new format
-        self.initUI()
-        self.color_scheme.apply_color_scheme(self)
+        self.displayed_format = self.file_format  # format the memory cells are shown in
+        self.format_inference = FormatInference()  # follows cell edits, sets the format of hand-entered programs
+        self.refresh_period = 1 / 30  # seconds between display refreshes while a program runs
+        self.step_budget = 100000  # instructions a run may execute, 0 for no limit
+        self.time_budget = 10.0  # seconds a run may take, 0 for no limit
+        self.worker = None  # ExecutionWorker of the run in progress
+        self.console_log = ConsoleLog(max_lines=10000)  # history behind console_output
+        self.console_flush_interval = 100  # milliseconds between console widget updates
+        # The memory model needs no widgets, so files can be loaded into a tab
+        # whose widgets are not built yet; initUI runs when the tab is first shown
+        self.memory_model = MemoryTableModel(self.uvsim.memory, self.file_format, self)
+        self.memory_model.invalid_edit.connect(lambda address, message: self.log(message))
+        self.memory_model.cell_edited.connect(self.on_cell_edited)
+        self.memory_model.set_markers(self.uvsim.breakpoints, self.uvsim.watchpoints)
+        self.ui_built = False
+
+    def showEvent(self, event):
+        self.ensure_ui()
+        super().showEvent(event)
+
+    def ensure_ui(self):
+        """Build the widgets, once; the application-wide stylesheet styles them."""
+        if self.ui_built:
+            return
+        with startup_timer.phase("build tab widgets"):
+            self.initUI()
+            self.ui_built = True
+            self.update_memory_display(full=True)
 
     def initUI(self):
         main_layout = QHBoxLayout()
         left_layout = QVBoxLayout()
         right_layout = QVBoxLayout()
 
-        # Memory Display
-        self.memory_labels = []
-        memory_container = QWidget()
-        memory_layout = QVBoxLayout(memory_container)
-
-        for i in range(250):
-            mem_row_layout = QHBoxLayout()
-            addr_label = QLabel(f"{i:03d}:")
-            addr_label.setFixedWidth(65)
-            mem_row_layout.addWidget(addr_label)
-            mem_label = QLineEdit("+000000")
-            mem_label.setFixedWidth(150)
-            mem_row_layout.addWidget(mem_label)
-            memory_layout.addLayout(mem_row_layout)
-            self.memory_labels.append(mem_label)
-
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setWidget(memory_container)
-        scroll_area.setMinimumWidth(250)
-        left_layout.addWidget(scroll_area)
+        # Memory Display, only the visible rows are formatted and painted
+        self.memory_view = QTableView()
+        self.memory_view.setModel(self.memory_model)
+        self.memory_view.horizontalHeader().setStretchLastSection(True)
+        self.memory_view.horizontalHeader().hide()
+        self.memory_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.memory_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.memory_view.setEditTriggers(self.EDIT_TRIGGERS)
+        self.memory_view.setItemDelegate(MemoryItemDelegate(self.memory_view))
+        self.memory_view.setMinimumWidth(250)
+        # Breakpoints and watchpoints are set from the memory view's context menu
+        # (or by double-clicking a row header) and marked B / W in the header
+        self.memory_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.memory_view.customContextMenuRequested.connect(self.show_memory_menu)
+        self.memory_view.verticalHeader().sectionDoubleClicked.connect(self.toggle_breakpoint)
+        left_layout.addWidget(self.memory_view)
+        self.heatmap_box = QCheckBox("Execution heatmap")
+        self.heatmap_box.setToolTip("Profile runs and colour each address by how often it executed")
+        left_layout.addWidget(self.heatmap_box)
 
         # User Input
         self.user_input = QLineEdit()
@@ -54,6 +89,36 @@ class UVSimTab(QWidget):
         self.step_button = QPushButton("Step Execution")
         self.reset_button = QPushButton("Reset")
         self.halt_button = QPushButton("Halt")
+        step_back_layout = QHBoxLayout()
+        self.step_back_button = QPushButton("Step Back")
+        self.step_back_count = QSpinBox()
+        self.step_back_count.setRange(1, self.journal_capacity)
+        self.step_back_count.setToolTip("Number of instructions to undo")
+        self.back_to_write_button = QPushButton("Back to Last Write...")
+        step_back_layout.addWidget(self.step_back_button)
+        step_back_layout.addWidget(self.step_back_count)
+        step_back_layout.addWidget(self.back_to_write_button)
+        budget_layout = QHBoxLayout()
+        self.step_budget_box = QSpinBox()
+        self.step_budget_box.setRange(0, 100000000)
+        self.step_budget_box.setSingleStep(1000)
+        self.step_budget_box.setSpecialValueText("No limit")
+        self.step_budget_box.setValue(self.step_budget)
+        self.step_budget_box.setToolTip("Instructions a run may execute")
+        self.time_budget_box = QDoubleSpinBox()
+        self.time_budget_box.setRange(0, 3600)
+        self.time_budget_box.setSuffix(" s")
+        self.time_budget_box.setSpecialValueText("No limit")
+        self.time_budget_box.setValue(self.time_budget)
+        self.time_budget_box.setToolTip("Seconds a run may take, not counting time waiting for input")
+        self.cycle_box = QCheckBox("Stop infinite loops")
+        self.cycle_box.setChecked(True)
+        self.cycle_box.setToolTip("Stop a run as soon as its state repeats")
+        budget_layout.addWidget(QLabel("Step limit:"))
+        budget_layout.addWidget(self.step_budget_box)
+        budget_layout.addWidget(QLabel("Time limit:"))
+        budget_layout.addWidget(self.time_budget_box)
+        budget_layout.addWidget(self.cycle_box)
         file_buttons_layout = QHBoxLayout()
         self.load_file_button = QPushButton("Load Instructions File")
         self.save_file_button = QPushButton("Save Instructions")
@@ -62,16 +127,33 @@ class UVSimTab(QWidget):
 
         right_layout.addWidget(self.run_button)
         right_layout.addWidget(self.step_button)
+        right_layout.addLayout(step_back_layout)
+        right_layout.addLayout(budget_layout)
         right_layout.addWidget(self.reset_button)
         right_layout.addWidget(self.halt_button)
         right_layout.addLayout(file_buttons_layout)
 
-        # Console Output
+        # Console Output, lines are batched in console_log and flushed on a timer
+        console_header_layout = QHBoxLayout()
+        console_header_layout.addWidget(QLabel("Console Output:"))
+        self.verbosity_box = QComboBox()
+        for level, name in VERBOSITY_NAMES.items():
+            self.verbosity_box.addItem(name, level)
+        self.verbosity_box.setCurrentIndex(self.verbosity_box.findData(self.console_log.verbosity))
+        console_header_layout.addWidget(self.verbosity_box)
+        self.export_trace_button = QPushButton("Export Trace")
+        console_header_layout.addWidget(self.export_trace_button)
+        right_layout.addLayout(console_header_layout)
+
         self.console_output = QTextEdit()
         self.console_output.setReadOnly(True)
-        right_layout.addWidget(QLabel("Console Output:"))
+        self.console_output.document().setMaximumBlockCount(self.console_log.max_lines)
         right_layout.addWidget(self.console_output)
 
+        self.console_timer = QTimer(self)
+        self.console_timer.timeout.connect(self.flush_console)
+        self.console_timer.start(self.console_flush_interval)
+
         # Accumulator & Program Counter
         self.accumulator_label = QLabel("Accumulator: 0000")
         self.program_counter_label = QLabel("Program Counter: 000")
@@ -85,70 +167,109 @@ class UVSimTab(QWidget):
         # Connect buttons
         self.run_button.clicked.connect(self.run_program)
         self.step_button.clicked.connect(self.step_execution)
+        self.step_back_button.clicked.connect(self.step_back)
+        self.step_budget_box.valueChanged.connect(self.set_step_budget)
+        self.time_budget_box.valueChanged.connect(self.set_time_budget)
+        self.back_to_write_button.clicked.connect(self.step_back_to_write)
         self.reset_button.clicked.connect(self.reset_simulator)
         self.halt_button.clicked.connect(self.halt_execution)
         self.load_file_button.clicked.connect(self.load_file)
         self.save_file_button.clicked.connect(self.save_file)
+        self.export_trace_button.clicked.connect(self.export_trace)
+        self.verbosity_box.currentIndexChanged.connect(self.set_verbosity)
+        self.heatmap_box.toggled.connect(self.set_heatmap)
+
+    def log(self, message, level=ERRORS):
+        """Queue a console line; it reaches the widget on the next flush."""
+        self.console_log.append(message, level)
+
+    def flush_console(self):
+        if not self.ui_built:
+            return  # lines wait in console_log until the console exists
+        lines = self.console_log.take_pending()
+        if lines:
+            self.console_output.append("\n".join(lines))
+
+    def set_verbosity(self, index):
+        self.console_log.verbosity = self.verbosity_box.itemData(index)
+
+    def set_heatmap(self, enabled):
+        """Profile execution and show the per-address counts in the memory pane."""
+        if enabled:
+            profiler = self.uvsim.enable_profiler()
+            self.memory_model.set_heat(profiler.address_counts)
+        else:
+            self.uvsim.profiler = None
+            self.memory_model.set_heat(None)
+
+    def export_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Trace", "",
+            "Text Files (*.txt);;All Files (*)"
+        )
+        if not file_path:
+            return
+        try:
+            count = self.console_log.export(file_path)
+            # Only what was logged at the verbosity of the time is in the buffer
+            self.log(f"Exported {count} console lines to {file_path} "
+                     f"(verbosity: {VERBOSITY_NAMES[self.console_log.verbosity]})")
+        except OSError as e:
+            self.log(f"Error exporting trace: {str(e)}")
 
     def load_file(self):
+        from file_functions import load_instruction_file
         load_instruction_file(self)
         if self.file_path:
-            self.console_output.append(f"Loaded file: {self.file_path}")
+            self.log(f"Loaded file: {self.file_path}")
+
+    def load_file_path(self, file_path):
+        """Load a file chosen elsewhere, e.g. by the window's Open File; works before the widgets exist."""
+        from file_functions import load_instruction_file
+        load_instruction_file(self, file_path)
+        self.log(f"Loaded file: {file_path}")
 
     def save_file(self):
+        from file_functions import save_instruction_file
         save_instruction_file(self)
         if self.file_path:
-            self.console_output.append(f"Saved file: {self.file_path}")
+            self.log(f"Saved file: {self.file_path}")
 
-    def update_memory_display(self):
+    def update_memory_display(self, full=False):
+        if not self.ui_built:
+            return  # ensure_ui does a full refresh
         if not hasattr(self, 'file_format'):
             self.file_format = "6-digit"  # Default to new format
-            
-        for i in range(min(250, len(self.memory_labels))):  # Updated to support 250 memory locations
-            value = self.uvsim.memory.get_value(i)
-            if self.file_format == "4-digit":
-                self.memory_labels[i].setText(f"{value:+05d}")
-            else:  # 6-digit
-                self.memory_labels[i].setText(f"{value:+07d}")
-                
+
+        # Only cells written since the last refresh need repainting, unless the
+        # format changed or a full refresh was asked for
+        dirty = self.uvsim.memory.take_dirty()
+        if full or self.displayed_format != self.file_format:
+            self.memory_model.set_format(self.file_format)
+            self.memory_model.refresh_all()
+            self.displayed_format = self.file_format
+        else:
+            self.memory_model.refresh_cells(dirty)
+
+        if self.uvsim.profiler is not None:
+            self.memory_model.set_heat(self.uvsim.profiler.address_counts)
+
         self.accumulator_label.setText(f"Accumulator: {self.uvsim.accumulator:+05d}")
         self.program_counter_label.setText(f"Program Counter: {self.uvsim.program_counter:03d}")
-        
-    def load_program_from_memory_labels(self):
-        self.console_output.append("Loading program into memory...")
-        program = []
-        
-        # Check if format is alredy determind
-        if not hasattr(self, 'file_format'):
-            self.file_format = "6-digit"  # Default to new format
-        
-        for i in range(250):  # UVSim memory size
-            try:
-                instruction = int(self.memory_labels[i].text())
-                if instruction == 0:
-                    program.append(0)  # Add zero instructions
-                    continue
-                    
-                # Validate against the current format
-                if self.file_format == "4-digit":
-                    if -9999 <= instruction <= 9999:
-                        program.append(instruction)
-                    else:
-                        self.console_output.append(f"Error: Invalid 4-digit instruction at memory[{i}]: {instruction}")
-                        return None
-                else:  # 6-digit
-                    if -999999 <= instruction <= 999999:
-                        program.append(instruction)
-                    else:
-                        self.console_output.append(f"Error: Invalid 6-digit instruction at memory[{i}]: {instruction}")
-                        return None
-            except ValueError:
-                self.console_output.append(f"Error: Non-numeric value in memory[{i}]")
-                return None
-        
-        self.console_output.append(f"Program loaded in {self.file_format} format")
-        return program
 
+    def on_cell_edited(self, address, word):
+        # Until a file fixes the format, the inferred one follows each edit
+        self.format_inference.update(address, word)
+        if self.uvsim.journal is not None:
+            self.uvsim.journal.clear()  # its steps no longer lead to this memory
+        if self.memory_model.format_fixed:
+            return
+        guess = self.format_inference.result()
+        if guess.format is not None and guess.format != self.file_format:
+            self.file_format = guess.format
+            self.uvsim.set_format(guess.format)
+            self.log(f"Using {guess} for the entered program")
+            self.update_memory_display(full=True)
 
     def read_user_input(self):
         text_value = self.user_input.text().strip()
@@ -158,116 +279,223 @@ class UVSimTab(QWidget):
                 0, -999999, 999999, 1
             )
             if not ok:
-                self.console_output.append("Error: Input cancelled.")
+                self.log("Error: Input cancelled.")
                 return None
         else:
             try:
                 value = int(text_value)
             except ValueError:
-                self.console_output.append("Error: Invalid integer input for READ.")
+                self.log("Error: Invalid integer input for READ.")
                 return None
         return value
 
     def run_program(self):
-        program = self.load_program_from_memory_labels()
-        if program is None:
-            return
-            
-        # Modify the instruction parsing based on format
-        self.uvsim.load_program(program)
-        self.console_output.append(f"Program loaded in {self.file_format} format. Running program...")
+        from program_analysis import analyze_program
+        from execution_worker import ExecutionWorker
+        # Cell edits were validated and written to the VM's memory as they were
+        # made, so the run starts from it without parsing or copying anything
+        self.uvsim.set_format(self.file_format)
+        program = self.uvsim.memory.memory
+        if self.uvsim.profiler is not None:
+            self.uvsim.profiler.reset()  # the heatmap shows this run only
 
-        execution_limit = 1000
-        step_count = 0
-        continue_exec = True
+        # Check the program before spending the step budget on it
+        analysis = analyze_program(
+            program, self.uvsim.format, self.uvsim.program_counter, self.uvsim.memory.size
+        )
+        for finding in analysis.findings:
+            self.log(f"Analysis: {finding}")
+        if analysis.never_halts:
+            answer = QMessageBox.question(
+                self, "Program Never Halts",
+                "Analysis found that this program can never reach HALT. Run it anyway?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if answer != QMessageBox.Yes:
+                self.log("Run cancelled.")
+                return
+        self.log(f"Running program in {self.file_format} format...")
 
-        while continue_exec and step_count < execution_limit:
-            instruction = self.uvsim.memory.get_value(self.uvsim.program_counter)
-            
-            # Parse opcode and operand differently based on format
-            if self.file_format == "4-digit":
-                opcode = instruction // 100
-                operand = instruction % 100
-            else:  # 6-digit
-                opcode = instruction // 1000
-                operand = instruction % 1000
-                
-            self.console_output.append(f"Step {step_count + 1}: PC = {self.uvsim.program_counter:03d}, Opcode = {opcode}, Operand = {operand}")
-
-            # Handle READ instruction separately (requires user input)
-            if opcode == 10:
-                value = self.read_user_input()
-                if value is None:
-                    self.console_output.append("Error: No input provided for READ instruction.")
-                    break
-            else:
-                value = None
+        # The fetch/execute loop runs in a worker thread so the window stays responsive
+        self.worker = ExecutionWorker(self.uvsim, self.console_log, execution_limit=self.step_budget or None,
+                                      emit_interval=self.refresh_period, parent=self,
+                                      time_limit=self.time_budget or None, detect_cycles=self.cycle_box.isChecked())
+        self.worker.progress.connect(self.update_memory_display)
+        self.worker.input_requested.connect(self.provide_worker_input)
+        self.worker.run_finished.connect(self.on_run_finished)
+        self.set_running(True)
+        self.worker.start()
 
-            # Execute the instruction using the run() method
-            try:
-                message, continue_exec = self.uvsim.run(value)
-                self.console_output.append(message)
-            except Exception as e:
-                self.console_output.append(f"Error executing instruction: {str(e)}")
-                break
+    def set_step_budget(self, steps):
+        self.step_budget = steps
 
-            # Update the GUI display
-            self.update_memory_display()
+    def set_time_budget(self, seconds):
+        self.time_budget = seconds
 
-            # Increment step count
-            step_count += 1
+    def set_running(self, running):
+        """Disable the controls that must not touch the VM while the worker runs it."""
+        self.run_button.setEnabled(not running)
+        self.step_button.setEnabled(not running)
+        self.step_back_button.setEnabled(not running)
+        self.back_to_write_button.setEnabled(not running)
+        self.heatmap_box.setEnabled(not running)
+        self.step_budget_box.setEnabled(not running)
+        self.time_budget_box.setEnabled(not running)
+        self.cycle_box.setEnabled(not running)
+        self.reset_button.setEnabled(not running)
+        self.load_file_button.setEnabled(not running)
+        self.memory_view.setEditTriggers(QAbstractItemView.NoEditTriggers if running else self.EDIT_TRIGGERS)
 
-        if step_count >= execution_limit:
-            self.console_output.append("Execution halted due to reaching execution limit.")
+    def provide_worker_input(self, address):
+        if self.worker is not None:
+            self.worker.provide_input(self.read_user_input())
+
+    def on_run_finished(self, status):
+        if status:
+            self.log(status)
+        self.flush_console()
+        if self.worker is not None:
+            self.worker.wait()
+            self.worker = None
+        self.set_running(False)
+        self.update_memory_display(full=True)
+
+    def stop_worker(self):
+        """Cancel a running program and wait for its thread, e.g. before the tab closes."""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+            self.worker = None
 
 
     def step_execution(self):
-        self.console_output.append("Executing one step...")
-        if self.uvsim.program_counter >= 250:
-            self.console_output.append("Program counter out of range. Cannot step further.")
+        self.log("Executing one step...", TRACE)
+        if self.uvsim.program_counter >= self.uvsim.memory.size:
+            self.log("Program counter out of range. Cannot step further.")
             return
         try:
-            instruction = self.uvsim.memory.get_value(self.uvsim.program_counter)
-            
-            # Parse opcode and operand based on format
-            if self.file_format == "4-digit":
-                opcode = instruction // 100
-                operand = instruction % 100
-            else:  # 6-digit
-                opcode = instruction // 1000
-                operand = instruction % 1000
-                
-            self.console_output.append(f"Step: PC = {self.uvsim.program_counter:03d}, Opcode = {opcode}, Operand = {operand}")
+            # Split the word as Run does, including the wider operands of large memories
+            self.uvsim.set_format(self.file_format)
+            instruction, opcode, operand, _ = self.uvsim.decode(self.uvsim.program_counter)
+
+            self.log(f"Step: PC = {self.uvsim.program_counter:03d}, Opcode = {opcode}, Operand = {operand}", TRACE)
             
+            value = None
             if opcode == 10:
                 value = self.read_user_input()
                 if value is None:
-                    self.console_output.append("Error: No input provided for READ instruction.")
+                    self.log("Error: No input provided for READ instruction.")
                     return
-                self.uvsim.memory.set_value(operand, value)
             self.uvsim.instruction_register = instruction
             self.uvsim.opcode = opcode
             self.uvsim.operand = operand
             if opcode == 43:
-                self.console_output.append("HALT instruction encountered.")
+                self.log("HALT instruction encountered.")
             elif opcode in [10, 11, 20, 21, 30, 31, 32, 33, 40, 41, 42]:
-                result, continue_exec = self.uvsim.run(value=None)
-                self.console_output.append(result)
+                result, continue_exec = self.uvsim.run(value=value)
+                self.log(result, IO if opcode in (10, 11) else TRACE)
             else:
-                self.console_output.append(f"Unknown opcode: {opcode}")
+                self.log(f"Unknown opcode: {opcode}")
             self.update_memory_display()
         except Exception as e:
-            self.console_output.append(f"Error executing instruction: {str(e)}")
+            self.log(f"Error executing instruction: {str(e)}")
         
+    def step_back(self):
+        count = self.step_back_count.value()
+        undone = self.uvsim.step_back(count)
+        if undone:
+            self.log(f"Stepped back {undone} instruction(s) to PC = {self.uvsim.program_counter:03d}")
+        else:
+            self.log("No earlier step to go back to.")
+        self.update_memory_display()
+
+    def step_back_to_write(self):
+        address, ok = QInputDialog.getInt(self, "Back to Last Write", "Memory address:", 0, 0, self.uvsim.memory.size - 1)
+        if not ok:
+            return
+        undone = self.uvsim.step_back_to_write(address)
+        if undone:
+            self.log(f"Stepped back {undone} instruction(s) to the last write of memory[{address:03d}], "
+                     f"PC = {self.uvsim.program_counter:03d}")
+        else:
+            self.log(f"No recorded write to memory[{address:03d}].")
+        self.update_memory_display()
+
+    def show_memory_menu(self, position):
+        index = self.memory_view.indexAt(position)
+        if not index.isValid():
+            return
+        address = index.row()
+        menu = QMenu(self)
+        breakpoint_action = menu.addAction(
+            "Clear Breakpoint" if address in self.uvsim.breakpoints else "Set Breakpoint")
+        condition_action = menu.addAction("Set Conditional Breakpoint...")
+        watch_action = menu.addAction(
+            "Clear Watchpoint" if address in self.uvsim.watchpoints else "Break on Write")
+        menu.addSeparator()
+        clear_action = menu.addAction("Clear All Breakpoints")
+        chosen = menu.exec_(self.memory_view.viewport().mapToGlobal(position))
+        if chosen is breakpoint_action:
+            self.toggle_breakpoint(address)
+        elif chosen is condition_action:
+            self.set_conditional_breakpoint(address)
+        elif chosen is watch_action:
+            self.toggle_watchpoint(address)
+        elif chosen is clear_action:
+            self.uvsim.clear_breakpoints()
+            self.memory_model.refresh_markers()
+            self.log("All breakpoints and watchpoints cleared.")
+
+    def toggle_breakpoint(self, address):
+        if address in self.uvsim.breakpoints:
+            self.uvsim.clear_breakpoint(address)
+            self.log(f"Breakpoint at {address:03d} cleared.")
+        else:
+            self.uvsim.set_breakpoint(address)
+            self.log(f"Breakpoint set at {address:03d}.")
+        self.memory_model.refresh_markers()
+
+    def set_conditional_breakpoint(self, address):
+        current = self.uvsim.breakpoints.get(address)
+        text, ok = QInputDialog.getText(
+            self, "Conditional Breakpoint",
+            f"Stop at {address:03d} when the accumulator is (e.g. < 0, == 10):",
+            text=f"{current.comparison} {current.value}" if current is not None else "")
+        if not ok or not text.strip():
+            return
+        try:
+            self.uvsim.set_breakpoint(address, text)
+        except ValueError as e:
+            self.log(f"Error: {e}")
+            return
+        self.log(f"Breakpoint set at {address:03d} when {self.uvsim.breakpoints[address]}.")
+        self.memory_model.refresh_markers()
+
+    def toggle_watchpoint(self, address):
+        if address in self.uvsim.watchpoints:
+            self.uvsim.clear_watchpoint(address)
+            self.log(f"Watchpoint on {address:03d} cleared.")
+        else:
+            self.uvsim.set_watchpoint(address)
+            self.log(f"Watching writes to {address:03d}.")
+        self.memory_model.refresh_markers()
+
     def reset_simulator(self):
+        self.console_log.clear()
         self.console_output.clear()
-        self.console_output.append("Simulator reset.")
-        self.uvsim = UVSim()
-        for label in self.memory_labels:
-            label.setText("+000000")
+        self.log("Simulator reset.")
+        # Back to the just-loaded state; only the cells that differ are rewritten and repainted
+        self.uvsim.restore(self.loaded_snapshot)
+        # The inference counts the restored words again, not the ones Reset cleared
+        self.format_inference.load(self.uvsim.memory.memory)
+        self.memory_model.format_fixed = self.loaded_format_fixed
+        self.file_format = self.loaded_snapshot.format
+        if self.uvsim.profiler is not None:
+            self.uvsim.profiler.reset()
         self.update_memory_display()
 
     def halt_execution(self):
-        self.console_output.append("Program halted by user.")
-        self.uvsim.program_counter = 100
-        self.update_memory_display()
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()  # the worker reports the halt when it stops
+        else:
+            self.log("No program is running.")
@@ -0,0 +1,210 @@
+"""
+Lockstep execution of one BasicML program against many input vectors.
+
+BatchEngine holds N virtual machines as NumPy arrays, an N x memory-size
+matrix plus accumulator, program counter and step vectors, and executes
+one instruction on every running instance per pass. Words are decoded for
+all instances at once and each opcode group is applied with a masked
+update, so instances that take different branches still share the work.
+
+An instance whose next instruction would raise (empty word, unknown opcode,
+address out of range, division by zero, STORE or READ value out of range,
+missing input), or whose accumulator would outgrow int64, is handed to a
+regular UVSim from that point on. Its errors and messages are therefore
+exactly those of UVSim.run_until_halt. Without NumPy, run_batch runs every
+input vector on its own UVSim.
+
+HALT does not print the simulator banner here.
+"""
+import contextlib
+import io
+
+try:
+    import numpy as np
+except ImportError:  # optional, run_batch falls back to one UVSim per input vector
+    np = None
+
+from UVSim import UVSim, RunResult, TRACE_OFF
+from memory_structure import MEMORY_SIZE, format_divisor
+
+VALID_OPCODES = (10, 11, 20, 21, 30, 31, 32, 33, 40, 41, 42, 43)
+MEMORY_OPCODES = (10, 11, 20, 21, 30, 31, 32, 33)  # opcodes whose operand is a memory address
+INPUT_LIMIT = 9999  # READ accepts signed four-digit values (InputOutputOps.read)
+SAFE_LIMIT = 2 ** 62  # larger accumulators continue on UVSim, which has unbounded ints
+INVALID_INPUT = INPUT_LIMIT + 1  # stands in for any input READ would reject
+
+if np is not None:
+    # Lookup tables indexed by the opcode clipped to 0..63, instead of np.isin per pass
+    VALID_TABLE = np.zeros(64, dtype=bool)
+    VALID_TABLE[list(VALID_OPCODES)] = True
+    MEMORY_TABLE = np.zeros(64, dtype=bool)
+    MEMORY_TABLE[list(MEMORY_OPCODES)] = True
+
+
+def load_template(program, file_format=None, memory_size=MEMORY_SIZE):
+    """Load program into a UVSim, inferring the format when file_format is None."""
+    vm = UVSim(memory_size)
+    vm.load_program(program, file_format)
+    return vm
+
+
+def run_scalar(words, file_format, inputs, max_steps, accumulator=0, program_counter=0,
+               memory_size=MEMORY_SIZE):
+    """Run one instance on a UVSim and return its RunResult."""
+    vm = UVSim(memory_size)
+    vm.set_format(file_format)
+    vm.memory.load_program(words)
+    vm.accumulator = accumulator
+    vm.program_counter = program_counter
+    with contextlib.redirect_stdout(io.StringIO()):  # keep the HALT banner quiet
+        return vm.run_until_halt(inputs=inputs, max_steps=max_steps, trace_level=TRACE_OFF)
+
+
+class BatchEngine:
+    def __init__(self, program, inputs, file_format=None, memory_size=MEMORY_SIZE):
+        if np is None:
+            raise ImportError("BatchEngine requires NumPy; run_batch works without it.")
+        template = load_template(program, file_format, memory_size)
+        self.format = template.format
+        self.memory_size = template.memory.size
+        self.divisor = format_divisor(self.format, self.memory_size)
+        self.store_limit = template.memory.word_limit  # STORE rejects larger accumulators
+        self.inputs = [list(values) for values in inputs]  # READ values, one list per instance
+        count = len(self.inputs)
+
+        self.memory = np.tile(np.array(template.memory.memory, dtype=np.int64), (count, 1))
+        self.accumulator = np.zeros(count, dtype=np.int64)
+        self.program_counter = np.zeros(count, dtype=np.int64)
+        self.steps = np.zeros(count, dtype=np.int64)
+        self.running = np.ones(count, dtype=bool)
+        self.halted = np.zeros(count, dtype=bool)
+
+        # Inputs as a padded matrix; the extra column keeps reads past the end in bounds
+        width = max((len(values) for values in self.inputs), default=0)
+        self.input_values = np.full((count, width + 1), INVALID_INPUT, dtype=np.int64)
+        for row, values in enumerate(self.inputs):
+            self.input_values[row, :len(values)] = [
+                value if isinstance(value, int) and -INPUT_LIMIT <= value <= INPUT_LIMIT else INVALID_INPUT
+                for value in values
+            ]
+        self.input_counts = np.array([len(values) for values in self.inputs], dtype=np.int64)
+        self.input_position = np.zeros(count, dtype=np.int64)
+
+        self.outputs = [[] for _ in range(count)]
+        self.results = [None] * count  # RunResult of instances finished on UVSim
+
+    def step(self, max_steps):
+        """Execute one instruction on every running instance; False once none are left."""
+        self.running &= self.steps < max_steps
+        rows = np.flatnonzero(self.running)
+        if not rows.size:
+            return False
+
+        # Vectorized fetch and decode
+        pc = self.program_counter[rows]
+        size = self.memory_size
+        words = self.memory[rows, np.minimum(pc, size - 1)]
+        opcode = words // self.divisor
+        operand = words % self.divisor
+        address = np.minimum(operand, size - 1)
+        value = self.memory[rows, address]
+        acc = self.accumulator[rows]
+        position = self.input_position[rows]
+        input_value = self.input_values[rows, position]
+
+        # Instances about to raise or overflow continue on UVSim
+        group = np.clip(opcode, 0, 63)
+        escape = (pc >= size) | ~VALID_TABLE[group]
+        escape |= MEMORY_TABLE[group] & (operand >= size)
+        escape |= (opcode == 10) & ((position >= self.input_counts[rows]) | (input_value == INVALID_INPUT))
+        escape |= (opcode == 21) & (np.abs(acc) > self.store_limit)
+        escape |= (opcode == 32) & (value == 0)
+        escape |= ((opcode == 30) | (opcode == 31)) & (np.abs(acc) > SAFE_LIMIT)
+        escape |= (opcode == 33) & (np.abs(acc) > SAFE_LIMIT // np.maximum(np.abs(value), 1))
+        if escape.any():
+            for row in rows[escape].tolist():
+                self.finish_on_uvsim(row, max_steps)
+            keep = ~escape
+            rows, pc, opcode, operand, address = rows[keep], pc[keep], opcode[keep], operand[keep], address[keep]
+            value, acc, position, input_value = value[keep], acc[keep], position[keep], input_value[keep]
+            if not rows.size:
+                return True
+
+        new_acc = acc.copy()
+        new_pc = pc + 1
+
+        mask = opcode == 10  # READ
+        if mask.any():
+            self.memory[rows[mask], address[mask]] = input_value[mask]
+            self.input_position[rows[mask]] = position[mask] + 1
+        mask = opcode == 11  # WRITE
+        if mask.any():
+            for row, written in zip(rows[mask].tolist(), value[mask].tolist()):
+                self.outputs[row].append(written)
+        mask = opcode == 20  # LOAD
+        new_acc[mask] = value[mask]
+        mask = opcode == 21  # STORE
+        if mask.any():
+            self.memory[rows[mask], address[mask]] = acc[mask]
+        mask = opcode == 30  # ADD
+        new_acc[mask] = acc[mask] + value[mask]
+        mask = opcode == 31  # SUBTRACT
+        new_acc[mask] = acc[mask] - value[mask]
+        mask = opcode == 32  # DIVIDE, floor division like the interpreter
+        new_acc[mask] = np.floor_divide(acc[mask], value[mask])
+        mask = opcode == 33  # MULTIPLY
+        new_acc[mask] = acc[mask] * value[mask]
+        mask = (opcode == 40) | ((opcode == 41) & (acc < 0)) | ((opcode == 42) & (acc == 0))  # branches taken
+        new_pc[mask] = operand[mask]
+        mask = opcode == 43  # HALT leaves the program counter on the HALT
+        new_pc[mask] = pc[mask]
+        self.halted[rows[mask]] = True
+        self.running[rows[mask]] = False
+
+        self.accumulator[rows] = new_acc
+        self.program_counter[rows] = new_pc
+        self.steps[rows] += 1
+        return True
+
+    def finish_on_uvsim(self, row, max_steps):
+        """Run instance row to the end on a UVSim, starting from its current state."""
+        steps = int(self.steps[row])
+        result = run_scalar(
+            self.memory[row].tolist(), self.format,
+            self.inputs[row][int(self.input_position[row]):], max_steps - steps,
+            int(self.accumulator[row]), int(self.program_counter[row]), self.memory_size,
+        )
+        result.outputs = self.outputs[row] + result.outputs
+        result.steps += steps
+        self.results[row] = result
+        self.running[row] = False
+
+    def run(self, max_steps=1000):
+        """Run every instance to HALT, an error or max_steps and return their RunResults."""
+        while self.step(max_steps):
+            pass
+        results = []
+        for row, result in enumerate(self.results):
+            if result is None:
+                result = RunResult()
+                result.accumulator = int(self.accumulator[row])
+                result.program_counter = int(self.program_counter[row])
+                result.outputs = self.outputs[row]
+                result.steps = int(self.steps[row])
+                result.halted = bool(self.halted[row])
+            results.append(result)
+        return results
+
+
+def run_batch(program, inputs, max_steps=1000, file_format=None, memory_size=MEMORY_SIZE):
+    """
+    Run program once per input vector in inputs and return a RunResult per
+    vector, as UVSim.run_until_halt would on a memory of memory_size words.
+    Uses BatchEngine when NumPy is installed, otherwise one UVSim per vector.
+    """
+    if np is not None:
+        return BatchEngine(program, inputs, file_format, memory_size).run(max_steps)
+    template = load_template(program, file_format, memory_size)
+    words = list(template.memory.memory)
+    return [run_scalar(words, template.format, list(values), max_steps, memory_size=memory_size)
+            for values in inputs]
@@ -0,0 +1,224 @@
+"""
+Headless runner for every combination of program files and input files.
+
+Jobs run on a ProcessPoolExecutor. The parsed programs and input vectors are
+sent to each worker once, through the pool initializer, so a job only carries
+two indexes. Programs are checked with program_analysis first, and those
+that can never halt are rejected without being run. Each job has a step
+limit and a wall-clock limit, and a job whose state repeats is stopped as
+an infinite loop. Results are appended to a JSONL file as jobs
+finish, and a summary is printed at the end:
+
+    python batch_runner.py --programs a.txt b.uvsb --inputs in1.txt in2.txt --output results.jsonl
+
+Input files hold one READ value per line; blank lines and '#' comments are skipped.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from UVSim import UVSim, TRACE_OFF
+from memory_structure import MEMORY_SIZE
+from program_parser import load_program_file
+from program_analysis import analyze_program
+
+CHUNK_STEPS = 10000  # steps a job runs compiled before cycle detection starts
+
+# Set in each worker process by init_worker
+_programs = None
+_inputs = None
+
+
+def read_inputs(file_path):
+    """Return the READ values in an input file, one integer per line."""
+    values = []
+    with open(file_path, 'r') as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                values.append(int(line))
+            except ValueError:
+                raise ValueError(f"{file_path}: Line {line_number}: Invalid input value: {line}")
+    return values
+
+
+def load_programs(paths):
+    """
+    Parse program files, skipping (and reporting) files with errors. Words
+    past the memory size are dropped, as the parser's warning says.
+    Returns a list of (path, words, format, entry point).
+    """
+    programs = []
+    for path in paths:
+        try:
+            program = load_program_file(path)
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}")
+            continue
+        for diagnostic in program.diagnostics:
+            print(f"{path}: {diagnostic}")
+        if program.ok and program.format:
+            programs.append((path, list(program.words[:MEMORY_SIZE]), program.format, program.entry_point))
+    return programs
+
+
+def check_programs(programs):
+    """
+    Analyze each program, reporting what was found. Returns {program index:
+    reason} for the programs that can never halt.
+    """
+    rejected = {}
+    for index, (path, words, file_format, entry_point) in enumerate(programs):
+        analysis = analyze_program(words, file_format, entry_point)
+        for finding in analysis.findings:
+            print(f"{path}: {finding}")
+        if analysis.never_halts:
+            rejected[index] = analysis.errors[0].message if analysis.errors else "Program can never halt."
+    return rejected
+
+
+def rejected_record(path, input_path, reason, status="rejected"):
+    return {
+        "program": path,
+        "inputs": input_path,
+        "status": status,
+        "error": reason,
+        "steps": 0,
+        "accumulator": 0,
+        "program_counter": 0,
+        "outputs": [],
+        "seconds": 0.0,
+    }
+
+
+def init_worker(programs, inputs):
+    global _programs, _inputs
+    _programs = programs
+    _inputs = inputs
+
+
+def run_job(program_index, input_index, max_steps, time_limit, detect_cycles=True):
+    """
+    Run one program against one input vector, in a worker process. The first
+    CHUNK_STEPS steps run on compiled blocks; a job still running after that
+    continues with cycle detection, so an infinite loop stops as soon as its
+    state repeats instead of using up max_steps.
+    """
+    path, words, file_format, entry_point = _programs[program_index]
+    input_path, values = _inputs[input_index]
+    vm = UVSim()
+    vm.load_program(words, file_format)
+    vm.program_counter = entry_point
+    vm.use_compiler()
+
+    inputs = iter(values)  # shared by both runs, so READ resumes where it stopped
+    start = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):  # keep the HALT banner out of the output
+        result = vm.run_until_halt(inputs=inputs, max_steps=min(CHUNK_STEPS, max_steps),
+                                   trace_level=TRACE_OFF, time_limit=time_limit)
+        steps = result.steps
+        outputs = list(result.outputs)
+        if not result.halted and result.error is None and steps < max_steps:
+            remaining = time_limit - (time.monotonic() - start) if time_limit is not None else None
+            result = vm.run_until_halt(inputs=inputs, max_steps=max_steps - steps, trace_level=TRACE_OFF,
+                                       time_limit=remaining, detect_cycles=detect_cycles)
+            steps += result.steps
+            outputs.extend(result.outputs)
+
+    if result.halted:
+        status = "halted"
+    elif result.timed_out:
+        status = "timeout"
+    elif result.cycle is not None:
+        status = "cycle"
+    elif result.error is not None:
+        status = "error"
+    else:
+        status = "step_limit"
+    return {
+        "program": path,
+        "inputs": input_path,
+        "status": status,  # halted, error, cycle, step_limit or timeout (rejected_record: rejected or error)
+        "error": None if status in ("halted", "step_limit") else result.error,
+        "steps": steps,
+        "accumulator": vm.accumulator,
+        "program_counter": vm.program_counter,
+        "outputs": outputs,
+        "seconds": time.monotonic() - start,
+    }
+
+
+def run_all(program_paths, input_paths, output_path, max_steps=1000, time_limit=None, workers=None,
+            analyze=True, detect_cycles=True):
+    """
+    Run every program against every input file across worker processes and
+    append one JSON line per job to output_path. With analyze, programs that
+    can never halt get "rejected" records instead of running, and with
+    detect_cycles jobs stop as soon as their state repeats. A job that
+    raises gets an "error" record, so the rest of the batch still runs.
+    Returns the summary dict.
+    """
+    programs = load_programs(program_paths)
+    inputs = [(path, read_inputs(path)) for path in input_paths] or [(None, [])]
+    rejected = check_programs(programs) if analyze else {}
+    summary = {"jobs": 0, "halted": 0, "error": 0, "step_limit": 0, "timeout": 0, "cycle": 0, "rejected": 0, "steps": 0}
+    start = time.monotonic()
+
+    def write(record):
+        sink.write(json.dumps(record) + "\n")
+        sink.flush()
+        summary["jobs"] += 1
+        summary[record["status"]] += 1
+        summary["steps"] += record["steps"]
+
+    with open(output_path, 'a') as sink, ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(programs, inputs)) as pool:
+        futures = {}
+        for program_index in range(len(programs)):
+            for input_index in range(len(inputs)):
+                if program_index in rejected:
+                    write(rejected_record(programs[program_index][0], inputs[input_index][0], rejected[program_index]))
+                else:
+                    future = pool.submit(run_job, program_index, input_index, max_steps, time_limit, detect_cycles)
+                    futures[future] = (programs[program_index][0], inputs[input_index][0])
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                record = rejected_record(*futures[future], str(e), status="error")
+            write(record)
+
+    summary["seconds"] = time.monotonic() - start
+    return summary
+
+
+def print_summary(summary):
+    print(f"{summary['jobs']} jobs in {summary['seconds']:.2f}s: "
+          f"{summary['halted']} halted, {summary['error']} errors, "
+          f"{summary['step_limit']} hit the step limit, {summary['timeout']} timed out, "
+          f"{summary['cycle']} stopped in infinite loops, "
+          f"{summary['rejected']} rejected by analysis")
+    print(f"{summary['steps']} instructions executed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run BasicML programs against input files in parallel.")
+    parser.add_argument("--programs", nargs="+", required=True, help="program files (.txt or .uvsb)")
+    parser.add_argument("--inputs", nargs="*", default=[], help="input files, one READ value per line")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--max-steps", type=int, default=1000, help="step limit per job")
+    parser.add_argument("--timeout", type=float, default=None, help="wall-clock limit per job in seconds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--no-analysis", action="store_true", help="run programs that can never halt anyway")
+    parser.add_argument("--no-cycle-detection", action="store_true",
+                        help="run long jobs on compiled blocks to the step limit instead of checking for repeated states")
+    args = parser.parse_args()
+
+    print_summary(run_all(args.programs, args.inputs, args.output, args.max_steps, args.timeout, args.workers,
+                          analyze=not args.no_analysis, detect_cycles=not args.no_cycle_detection))
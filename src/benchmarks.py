@@ -0,0 +1,259 @@
+"""
+Engine benchmarks for UVSim.
+
+Runs test_program.txt and a set of synthetic workloads in both instruction
+formats, measures per-opcode cost and memory per VM instance, and writes
+the results as JSON so runs can be compared:
+
+    python benchmarks.py --output results.json
+    python benchmarks.py --baseline results.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from UVSim import UVSim
+from program_parser import parse_file
+
+FORMATS = ("4-digit", "6-digit")
+OPCODE_NAMES = {
+    10: "READ", 11: "WRITE", 20: "LOAD", 21: "STORE",
+    30: "ADD", 31: "SUBTRACT", 32: "DIVIDE", 33: "MULTIPLY",
+    40: "BRANCH", 41: "BRANCHNEG", 42: "BRANCHZERO",
+}
+TEST_PROGRAM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "test_program.txt")
+
+
+def encode(opcode, operand, file_format):
+    """Build an instruction word for the given format."""
+    return opcode * (100 if file_format == "4-digit" else 1000) + operand
+
+
+def with_data(code, data):
+    """Place code at address 0 and data words at their addresses."""
+    program = list(code) + [0] * (max(data) + 1 - len(code))
+    for address, value in data.items():
+        program[address] = value
+    return program
+
+
+def counting_loop(file_format, iterations):
+    # counter (90) counts down by one (91) until zero
+    e = lambda op, addr: encode(op, addr, file_format)
+    code = [e(20, 90), e(31, 91), e(21, 90), e(42, 5), e(40, 0), e(43, 0)]
+    return with_data(code, {90: iterations, 91: 1})
+
+
+def arithmetic_block(file_format, iterations):
+    # a run of ADD/SUBTRACT/MULTIPLY/DIVIDE on a scratch value, then the counter update
+    e = lambda op, addr: encode(op, addr, file_format)
+    body = [e(20, 92), e(30, 93), e(33, 94), e(32, 94), e(31, 93), e(30, 95), e(31, 95), e(21, 92)] * 3
+    loop = body + [e(20, 90), e(31, 91), e(21, 90)]
+    code = loop + [e(42, len(loop) + 2), e(40, 0), e(43, 0)]
+    return with_data(code, {90: iterations, 91: 1, 92: 7, 93: 5, 94: 3, 95: 11})
+
+
+def branch_heavy(file_format, iterations):
+    # each iteration tests a negative, a zero and a positive value before looping
+    e = lambda op, addr: encode(op, addr, file_format)
+    code = [
+        e(20, 93), e(41, 3), e(43, 0),  # 0-2: negative value, BRANCHNEG taken
+        e(20, 94), e(42, 6), e(43, 0),  # 3-5: zero value, BRANCHZERO taken
+        e(20, 95), e(41, 0), e(42, 0),  # 6-8: positive value, neither taken
+        e(20, 90), e(31, 91), e(21, 90),  # 9-11: counter update
+        e(42, 14), e(40, 0), e(43, 0),  # 12-14
+    ]
+    return with_data(code, {90: iterations, 91: 1, 93: -1, 94: 0, 95: 1})
+
+
+def self_modifying(file_format, iterations):
+    # sums a 20-word table by rewriting the operand of the LOAD at address 0
+    e = lambda op, addr: encode(op, addr, file_format)
+    code = [
+        e(20, 60),  # 0: LOAD table cell, operand is patched below
+        e(30, 92), e(21, 92),  # 1-2: add it to the sum
+        e(20, 0), e(30, 91), e(21, 0),  # 3-5: STORE the LOAD back with operand + 1
+        e(31, 93), e(42, 9), e(40, 0),  # 6-8: loop until the operand reaches the end of the table
+        e(20, 94), e(21, 0), e(20, 95), e(21, 92),  # 9-12: restore the LOAD, clear the sum
+        e(20, 90), e(31, 91), e(21, 90),  # 13-15: counter update
+        e(42, 18), e(40, 0), e(43, 0),  # 16-18
+    ]
+    data = {90: max(1, iterations // 10), 91: 1, 92: 0, 93: e(20, 80), 94: e(20, 60), 95: 0}
+    data.update({60 + i: i + 1 for i in range(20)})
+    return with_data(code, data)
+
+
+WORKLOADS = {
+    "counting_loop": counting_loop,
+    "arithmetic_block": arithmetic_block,
+    "branch_heavy": branch_heavy,
+    "self_modifying": self_modifying,
+}
+
+
+def time_run(program, file_format, inputs=None, max_steps=10 ** 8, repeat=3):
+    """Return (steps, best seconds, result) for running program to completion."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        vm = UVSim()
+        vm.set_format(file_format)
+        vm.memory.load_program(program)
+        vm.decode_program()
+        gc.collect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = vm.run_until_halt(inputs=inputs, max_steps=max_steps)
+            elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return result.steps, best, result
+
+
+def workload_entry(name, file_format, steps, seconds, result):
+    # A run that stopped on an error or the step limit measured the wrong path, so it gets no rate
+    return {
+        "name": name,
+        "format": file_format,
+        "steps": steps,
+        "seconds": seconds,
+        "instructions_per_second": steps / seconds if seconds and result.halted else None,
+        "halted": result.halted,
+        "error": result.error,
+    }
+
+
+def bench_workloads(iterations, repeat):
+    entries = []
+    if os.path.exists(TEST_PROGRAM):
+        parsed = parse_file(TEST_PROGRAM)
+        # Time enough repetitions of the short test program to be measurable
+        runs = max(1, iterations // 10)
+        best = None
+        steps = 0
+        for _ in range(repeat):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                steps = 0
+                for _ in range(runs):
+                    vm = UVSim()
+                    vm.load_program(parsed.words)
+                    result = vm.run_until_halt(inputs=[12, 4])
+                    steps += result.steps
+                    if not result.halted:
+                        break
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None or elapsed < best else best
+        entries.append(workload_entry("test_program", parsed.format, steps, best, result))
+
+    for name, build in WORKLOADS.items():
+        for file_format in FORMATS:
+            steps, seconds, result = time_run(build(file_format, iterations), file_format, repeat=repeat)
+            entries.append(workload_entry(name, file_format, steps, seconds, result))
+    return entries
+
+
+def bench_opcodes(steps, repeat):
+    """
+    Time each opcode by filling memory with copies of it followed by a
+    BRANCH back to 0, so nearly every step executes the opcode under test.
+    """
+    costs = {}
+    for file_format in FORMATS:
+        data_address = 99
+        costs[file_format] = {}
+        for opcode, name in OPCODE_NAMES.items():
+            operand = data_address
+            if opcode in (40, 41, 42):
+                operand = 0  # branches loop back to the start
+            body = [encode(opcode, operand, file_format)] * 90 + [encode(40, 0, file_format)]
+            program = with_data(body, {data_address: 1})
+            # READ gets an endless input stream; the accumulator stays 0, so
+            # BRANCHNEG falls through while BRANCHZERO is always taken
+            inputs = itertools.repeat(1) if opcode == 10 else None
+            executed, seconds, _ = time_run(program, file_format, inputs=inputs, max_steps=steps, repeat=repeat)
+            costs[file_format][name] = {
+                "steps": executed,
+                "ns_per_instruction": seconds / executed * 1e9 if executed else None,
+            }
+    return costs
+
+
+def bench_memory(instances=200):
+    """Average bytes allocated per UVSim instance with a program loaded."""
+    program = counting_loop("6-digit", 10)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    vms = []
+    for _ in range(instances):
+        vm = UVSim()
+        vm.load_program(program)
+        vms.append(vm)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return {"instances": instances, "bytes_per_instance": allocated / instances}
+
+
+def run_benchmarks(iterations=20000, opcode_steps=200000, repeat=3):
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workloads": bench_workloads(iterations, repeat),
+        "opcodes": bench_opcodes(opcode_steps, repeat),
+        "memory": bench_memory(),
+    }
+
+
+def print_report(results, baseline=None):
+    previous = {}
+    if baseline:
+        previous = {(w["name"], w["format"]): w for w in baseline.get("workloads", [])}
+    print(f"{'workload':<20}{'format':<10}{'steps':>12}{'instr/sec':>16}{'vs baseline':>14}")
+    for entry in results["workloads"]:
+        if not entry["halted"]:
+            print(f"{entry['name']:<20}{entry['format']:<10}{entry['steps']:>12}  did not halt: {entry['error']}")
+            continue
+        ips = entry["instructions_per_second"] or 0
+        line = f"{entry['name']:<20}{entry['format']:<10}{entry['steps']:>12}{ips:>16,.0f}"
+        old = previous.get((entry["name"], entry["format"]))
+        if old and old.get("instructions_per_second"):
+            line += f"{ips / old['instructions_per_second']:>13.2f}x"
+        print(line)
+    print()
+    for file_format, costs in results["opcodes"].items():
+        row = ", ".join(f"{name} {cost['ns_per_instruction']:.0f}ns" for name, cost in costs.items()
+                        if cost["ns_per_instruction"] is not None)
+        print(f"{file_format}: {row}")
+    print()
+    print(f"Memory per VM instance: {results['memory']['bytes_per_instance']:.0f} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the UVSim engine.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write results to")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--iterations", type=int, default=20000, help="loop iterations per synthetic workload")
+    parser.add_argument("--opcode-steps", type=int, default=200000, help="steps per opcode measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best is kept")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.opcode_steps, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
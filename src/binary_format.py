@@ -0,0 +1,195 @@
+"""
+Compact binary container for BasicML programs.
+
+Each program is a 20-byte header followed by its words packed as
+little-endian int32:
+
+    magic        4s  b"UVSB"
+    version      B   BINARY_VERSION
+    digits       B   4 or 6 (instruction format)
+    reserved     H   0
+    word_count   I
+    entry_point  I   address execution starts at
+    checksum     I   zlib.crc32 of the packed words
+
+A corpus file is any number of these records back to back. ProgramCorpus
+maps the file with mmap and hands out memoryviews over the words, so a
+program can be copied into UVSimMemory without parsing or building ints.
+"""
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+
+MAGIC = b"UVSB"
+BINARY_VERSION = 1
+HEADER = struct.Struct("<4sBBHIII")
+FORMAT_DIGITS = {"4-digit": 4, "6-digit": 6}
+DIGITS_FORMAT = {4: "4-digit", 6: "6-digit"}
+NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _pack_words(words):
+    packed = array('i', words)
+    if not NATIVE_LITTLE_ENDIAN:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def pack_program(words, file_format, entry_point=0):
+    """Return the binary record (header and words) for one program."""
+    if file_format not in FORMAT_DIGITS:
+        raise ValueError("Format must be either '4-digit' or '6-digit'")
+    data = _pack_words(words)
+    header = HEADER.pack(MAGIC, BINARY_VERSION, FORMAT_DIGITS[file_format], 0,
+                         len(data) // 4, entry_point, zlib.crc32(data))
+    return header + data
+
+
+def write_corpus(file_path, programs):
+    """
+    Write programs to file_path. Each item is (words, file_format) or
+    (words, file_format, entry_point). Returns the number of programs written.
+    """
+    count = 0
+    with open(file_path, 'wb') as file:
+        for program in programs:
+            file.write(pack_program(*program))
+            count += 1
+    return count
+
+
+def write_program(file_path, words, file_format, entry_point=0):
+    """Write a single program as a one-entry corpus."""
+    write_corpus(file_path, [(words, file_format, entry_point)])
+
+
+class BinaryProgram:
+    """One program inside a corpus; words is a zero-copy view when possible."""
+
+    def __init__(self, words, file_format, entry_point, checksum):
+        self.words = words
+        self.format = file_format
+        self.entry_point = entry_point
+        self.checksum = checksum
+
+    def verify(self):
+        """True when the words still match the checksum in the header."""
+        data = self.words if NATIVE_LITTLE_ENDIAN else _pack_words(self.words)
+        return zlib.crc32(data) == self.checksum
+
+
+class ProgramCorpus:
+    """
+    Read-only, memory-mapped access to a corpus file. The header index is
+    built with one pass over the headers only; words are never parsed.
+    Views returned by get() must be released before close().
+    """
+
+    def __init__(self, file_path):
+        self.file = open(file_path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file, nothing to map
+            self.map = None
+        self.offsets = []  # (header offset, word count) per program
+        self._index()
+
+    def _index(self):
+        size = len(self.map) if self.map is not None else 0
+        offset = 0
+        while offset < size:
+            if offset + HEADER.size > size:
+                raise ValueError(f"Truncated header at byte {offset}")
+            magic, version, digits, _, count, _, _ = HEADER.unpack_from(self.map, offset)
+            if magic != MAGIC:
+                raise ValueError(f"Not a UVSim binary program at byte {offset}")
+            if version != BINARY_VERSION:
+                raise ValueError(f"Unsupported binary version {version} at byte {offset}")
+            if digits not in DIGITS_FORMAT:
+                raise ValueError(f"Unknown instruction format at byte {offset}")
+            end = offset + HEADER.size + count * 4
+            if end > size:
+                raise ValueError(f"Truncated program at byte {offset}")
+            self.offsets.append((offset, count))
+            offset = end
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def get(self, index, verify=False):
+        """Return program number index as a BinaryProgram."""
+        offset, count = self.offsets[index]
+        _, _, digits, _, _, entry_point, checksum = HEADER.unpack_from(self.map, offset)
+        start = offset + HEADER.size
+        if NATIVE_LITTLE_ENDIAN:
+            words = memoryview(self.map)[start:start + count * 4].cast('i')
+        else:
+            words = array('i', self.map[start:start + count * 4])
+            words.byteswap()
+        program = BinaryProgram(words, DIGITS_FORMAT[digits], entry_point, checksum)
+        if verify and not program.verify():
+            raise ValueError(f"Checksum mismatch for program {index}")
+        return program
+
+    def __getitem__(self, index):
+        return self.get(index)
+
+    def load_into(self, uvsim, index, verify=False):
+        """
+        Copy program number index straight from the mapping into the memory
+        of uvsim through UVSim.load_program, which also sets the format and
+        clears the journal, and set its program counter.
+        """
+        program = self.get(index, verify)
+        try:
+            uvsim.load_program(program.words, program.format)
+            uvsim.program_counter = program.entry_point
+        finally:
+            if isinstance(program.words, memoryview):
+                program.words.release()
+        return program
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_program(file_path, index=0):
+    """Return (words, format, entry_point) of one program as plain Python values."""
+    with ProgramCorpus(file_path) as corpus:
+        program = corpus.get(index, verify=True)
+        words = list(program.words)
+        if isinstance(program.words, memoryview):
+            program.words.release()
+        return words, program.format, program.entry_point
+
+
+if __name__ == "__main__":
+    # Pack text program files into one corpus: python binary_format.py out.uvsb a.txt b.txt ...
+    import argparse
+    from program_parser import parse_file
+
+    parser = argparse.ArgumentParser(description="Pack BasicML text files into a binary corpus.")
+    parser.add_argument("output", help="corpus file to write")
+    parser.add_argument("programs", nargs="+", help="text program files")
+    args = parser.parse_args()
+
+    def parsed_programs():
+        for path in args.programs:
+            program = parse_file(path)
+            for diagnostic in program.diagnostics:
+                print(f"{path}: {diagnostic}")
+            if program.ok and program.format:
+                yield program.words, program.format
+
+    written = write_corpus(args.output, parsed_programs())
+    print(f"Wrote {written} programs to {args.output}")
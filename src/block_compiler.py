@@ -0,0 +1,227 @@
+"""
+Basic-block compiler for UVSim.
+
+Starting at an address, the compiler follows the program through its basic
+blocks: straight-line code up to BRANCH, BRANCHNEG or BRANCHZERO. An
+unconditional BRANCH and the fall-through of a conditional branch continue
+into the next block; a taken conditional branch leaves the compiled code,
+unless it jumps back to the start address, in which case the loop keeps
+running inside the generated function. The chained blocks are translated
+to Python source, compiled once with compile() and cached by start address.
+
+READ, HALT and anything that would raise (empty words, unknown opcodes,
+out-of-range operands) are left to the interpreter, as are a DIVIDE by zero
+or a STORE of an out-of-range value, which bail out to the interpreter
+before they execute. Results and errors therefore match UVSim.run exactly.
+
+Any write into a compiled block's address range, whether from a compiled
+STORE, the interpreter or the GUI, drops every compiled block covering it.
+Code that keeps rewriting itself is left to the interpreter after a few
+recompiles.
+"""
+from memory_structure import PAGE_SIZE
+
+MAX_CHAIN_LENGTH = 64  # instructions per compiled function
+MAX_RECOMPILES = 4  # invalidations of one start address before it is left to the interpreter
+
+# Opcodes compiled code can contain; everything else ends the chain before it
+STRAIGHT_LINE_OPCODES = (11, 20, 21, 30, 31, 32, 33)
+BRANCH_OPCODES = (40, 41, 42)
+CONDITIONS = {41: "acc < 0", 42: "acc == 0"}
+
+
+class CompiledBlock:
+    def __init__(self, start, addresses, function, source):
+        self.start = start
+        self.addresses = addresses  # addresses of the instructions compiled in
+        self.length = len(addresses)  # most instructions one pass can execute
+        self.function = function  # function(vm, budget) -> (steps executed, next program counter)
+        self.source = source
+
+
+class BlockCompiler:
+    def __init__(self, uvsim):
+        self.vm = uvsim
+        self.blocks = {}  # start address -> CompiledBlock
+        self.not_compilable = set()  # start addresses whose first instruction the interpreter must run
+        self.unstable = set()  # start addresses recompiled too often, left to the interpreter
+        self.recompiles = {}  # start address -> times its block was invalidated
+        self.covers = {}  # address -> start addresses of the blocks containing it
+        self.namespace = None
+        self.attach()
+
+    def attach(self):
+        """Start watching memory writes so stale blocks are dropped."""
+        memory = self.vm.memory
+        if self.invalidate not in memory.write_hooks:
+            memory.write_hooks.append(self.invalidate)
+        self.invalidate_all()
+
+    def detach(self):
+        memory = self.vm.memory
+        if self.invalidate in memory.write_hooks:
+            memory.write_hooks.remove(self.invalidate)
+        self.invalidate_all()
+
+    def invalidate_all(self):
+        memory = self.vm.memory
+        # Cleared in place, run_until_halt keeps a reference to blocks
+        self.blocks.clear()
+        self.not_compilable.clear()
+        self.unstable.clear()
+        self.recompiles.clear()
+        self.covers.clear()
+        # Names the generated code uses; rebuilt so blocks never hold a stale buffer
+        self.namespace = {
+            "mem": memory.memory,
+            "decoded": memory.decoded,
+            "memory": memory,  # memory.dirty is looked up per write, take_dirty() replaces it
+            "pages_add": memory.written_pages.add,
+            "hooks": memory.write_hooks,
+            "out": self.vm.outputs.append,
+        }
+
+    def invalidate(self, address):
+        """Write hook: drop the blocks that contain address (all blocks for None)."""
+        if address is None:
+            self.invalidate_all()
+            return
+        self.not_compilable.discard(address)
+        starts = self.covers.pop(address, None)
+        if not starts:
+            return
+        for start in starts:
+            block = self.blocks.pop(start, None)
+            if block is None:
+                continue
+            count = self.recompiles.get(start, 0) + 1
+            self.recompiles[start] = count
+            if count > MAX_RECOMPILES:
+                self.unstable.add(start)
+            for covered in block.addresses:
+                others = self.covers.get(covered)
+                if others is not None:
+                    others.discard(start)
+                    if not others:
+                        del self.covers[covered]
+
+    def lookup(self, address):
+        """Return the compiled block starting at address, compiling it on first use."""
+        block = self.blocks.get(address)
+        if block is None and address not in self.not_compilable and address not in self.unstable:
+            block = self.compile_block(address)
+            if block is None:
+                self.not_compilable.add(address)
+        return block
+
+    def decoded_entry(self, address):
+        vm = self.vm
+        if not 0 <= address < len(vm.memory.decoded):
+            return None
+        entry = vm.memory.decoded[address]
+        if entry is None:
+            entry = vm.decode(address)
+        return entry
+
+    def trace(self, start):
+        """
+        Follow the program from start and return (path, next_address, loops):
+        the (address, opcode, operand) instructions to compile, where execution
+        continues after the last one, and whether that is back at start.
+        """
+        memory_size = len(self.vm.memory.decoded)
+        path = []
+        seen = set()
+        address = start
+        loops = False
+        while len(path) < MAX_CHAIN_LENGTH and address not in seen:
+            entry = self.decoded_entry(address)
+            if entry is None:
+                break
+            word, opcode, operand, handler = entry
+            if handler is None or operand >= memory_size:
+                break
+            if opcode not in STRAIGHT_LINE_OPCODES and opcode not in BRANCH_OPCODES:
+                break
+            path.append((address, opcode, operand))
+            seen.add(address)
+            address = operand if opcode == 40 else address + 1
+            if address == start:
+                loops = True
+                break
+
+        # A STORE into an instruction of the chain makes the compiled copy stale,
+        # so the chain has to end right after it
+        for index, (store_address, opcode, operand) in enumerate(path):
+            if opcode == 21 and operand in seen:
+                return path[:index + 1], store_address + 1, False
+        return path, address, loops
+
+    def compile_block(self, start):
+        path, next_address, loops = self.trace(start)
+        if not path:
+            return None
+        length = len(path)
+
+        def leave(indent, steps, pc):
+            return [f"{indent}vm.accumulator = acc", f"{indent}return {steps}, {pc}"]
+
+        def back_edge(indent, steps):
+            # Jump back to start, staying in compiled code while the budget allows
+            return [
+                f"{indent}steps += {steps}",
+                f"{indent}if steps + {length} > budget:",
+                *leave(indent + "    ", "steps", start),
+                f"{indent}continue",
+            ]
+
+        word_limit = self.vm.memory.word_limit
+        lines = [f"def block_{start}(vm, budget):", "    acc = vm.accumulator", "    steps = 0", "    while True:"]
+        indent = "        "
+        for done, (address, opcode, operand) in enumerate(path):
+            if opcode == 11:  # WRITE
+                lines.append(f"{indent}out(mem[{operand}])")
+            elif opcode == 20:  # LOAD
+                lines.append(f"{indent}acc = mem[{operand}]")
+            elif opcode == 21:  # STORE, out-of-range values are left to the interpreter to report
+                lines.append(f"{indent}if not -{word_limit} <= acc <= {word_limit}:")
+                lines.extend(leave(indent + "    ", f"steps + {done}", address))
+                lines.append(f"{indent}mem[{operand}] = acc")
+                lines.append(f"{indent}decoded[{operand}] = None")
+                lines.append(f"{indent}memory.dirty.add({operand})")
+                lines.append(f"{indent}pages_add({operand // PAGE_SIZE})")
+                lines.append(f"{indent}for hook in hooks:")
+                lines.append(f"{indent}    hook({operand})")
+            elif opcode == 30:  # ADD
+                lines.append(f"{indent}acc += mem[{operand}]")
+            elif opcode == 31:  # SUBTRACT
+                lines.append(f"{indent}acc -= mem[{operand}]")
+            elif opcode == 32:  # DIVIDE, division by zero is left to the interpreter to report
+                lines.append(f"{indent}divisor = mem[{operand}]")
+                lines.append(f"{indent}if divisor == 0:")
+                lines.extend(leave(indent + "    ", f"steps + {done}", address))
+                lines.append(f"{indent}acc //= divisor")
+            elif opcode == 33:  # MULTIPLY
+                lines.append(f"{indent}acc *= mem[{operand}]")
+            elif opcode in CONDITIONS:  # BRANCHNEG, BRANCHZERO
+                lines.append(f"{indent}if {CONDITIONS[opcode]}:")
+                if operand == start:
+                    lines.extend(back_edge(indent + "    ", done + 1))
+                else:
+                    lines.extend(leave(indent + "    ", f"steps + {done + 1}", operand))
+            # BRANCH needs no code, the chain already continues at its target
+
+        if loops:
+            lines.extend(back_edge(indent, length))
+        else:
+            lines.extend(leave(indent, f"steps + {length}", next_address))
+
+        source = "\n".join(lines) + "\n"
+        namespace = dict(self.namespace)
+        exec(compile(source, f"<UVSim block {start}>", "exec"), namespace)
+        addresses = [address for address, _, _ in path]
+        block = CompiledBlock(start, addresses, namespace[f"block_{start}"], source)
+        self.blocks[start] = block
+        for address in addresses:
+            self.covers.setdefault(address, set()).add(start)
+        return block
@@ -0,0 +1,41 @@
+import operator
+import re
+
+COMPARISONS = {
+    "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge,
+}
+CONDITION_PATTERN = re.compile(r"^\s*(?:acc(?:umulator)?\s*)?(==|!=|<=|>=|<|>|=)\s*([+-]?\d+)\s*$", re.IGNORECASE)
+
+
+class Condition:
+    """A comparison of the accumulator with a constant, e.g. accumulator < 0."""
+
+    def __init__(self, comparison, value):
+        if comparison not in COMPARISONS:
+            raise ValueError(f"Unknown comparison: {comparison}")
+        self.comparison = comparison
+        self.value = value
+        self.test = COMPARISONS[comparison]
+
+    def __call__(self, accumulator):
+        return self.test(accumulator, self.value)
+
+    def __str__(self):
+        return f"accumulator {self.comparison} {self.value}"
+
+    def __repr__(self):
+        return f"Condition({self.comparison!r}, {self.value!r})"
+
+
+def parse_condition(text):
+    """
+    Parse a breakpoint condition such as "< 0", "acc == 10" or
+    "accumulator >= -5". A lone "=" means "==".
+    """
+    match = CONDITION_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Invalid breakpoint condition: {text}")
+    comparison, value = match.groups()
+    return Condition("==" if comparison == "=" else comparison, int(value))
@@ -1,42 +1,24 @@
 import json
 import os
-from PyQt5.QtWidgets import QInputDialog
+from PyQt5.QtWidgets import QApplication, QInputDialog
 
-class ColorScheme:
-    CONFIG_FILE = "color_config.json"
+# Default UVU colors: primary is dark green, off-color is white.
+DEFAULT_THEME = "UVU Green"
+DEFAULT_THEMES = {
+    "UVU Green": {"primary_color": "#4C721D", "off_color": "#FFFFFF"},
+    "Slate": {"primary_color": "#37474F", "off_color": "#ECEFF1"},
+    "Ocean": {"primary_color": "#1565C0", "off_color": "#F5F9FF"},
+    "High Contrast": {"primary_color": "#000000", "off_color": "#FFFFFF"},
+}
+CUSTOM_THEME = "Custom..."
 
-    def __init__(self):
-        self.color_config = self.load_color_config()
 
-    def load_color_config(self):
-        # Default UVU colors: primary is dark green, off-color is white.
-        default_config = {
-            "primary_color": "#4C721D",
-            "off_color": "#FFFFFF"
-        }
-        if os.path.exists(self.CONFIG_FILE):
-            try:
-                with open(self.CONFIG_FILE, "r") as f:
-                    config = json.load(f)
-                    # Basic validation: Check that both keys exist and are strings.
-                    if ("primary_color" in config and "off_color" in config and
-                        isinstance(config["primary_color"], str) and isinstance(config["off_color"], str)):
-                        return config
-            except Exception as e:
-                print("Error loading color configuration:", e)
-        return default_config
+def is_hex_color(value):
+    return isinstance(value, str) and value.startswith("#") and len(value) == 7
 
-    def save_color_config(self):
-        try:
-            with open(self.CONFIG_FILE, "w") as f:
-                json.dump(self.color_config, f, indent=4)
-        except Exception as e:
-            print("Error saving color configuration:", e)
 
-    def apply_color_scheme(self, widget):
-        primary = self.color_config["primary_color"]
-        off = self.color_config["off_color"]
-        style = f"""
+def build_stylesheet(primary, off):
+    return f"""
         QWidget {{
             background-color: {off};
             color: #333333;
@@ -69,6 +51,18 @@ class ColorScheme:
         QScrollArea {{
             border: none;
         }}
+        QTableView {{
+            background-color: #F0F0F0;
+            border: 1px solid {primary};
+            gridline-color: {primary};
+            color: #333333;
+        }}
+        QHeaderView::section {{
+            background-color: {off};
+            border: none;
+            font-weight: bold;
+            padding: 4px;
+        }}
         /* Style the vertical scrollbar */
         QScrollBar:vertical {{
             background: {off};
@@ -87,31 +81,119 @@ class ColorScheme:
             background: none;
         }}
         """
-        widget.setStyleSheet(style)
+
+
+class ColorScheme:
+    """
+    Colours of the interface, applied as one stylesheet on the QApplication
+    so every window and tab, including ones built later, picks it up without
+    a stylesheet of its own. Stylesheets are built once per pair of colours
+    and cached, and applying the one already in use does nothing.
+    """
+    CONFIG_FILE = "color_config.json"
+
+    def __init__(self):
+        self.stylesheets = {}  # (primary, off) -> stylesheet text
+        self.applied = None  # stylesheet last set on the application
+        self.color_config = self.load_color_config()
+
+    def load_color_config(self):
+        # Named presets from the file are added to (or replace) the built-in ones
+        config = {
+            "theme": DEFAULT_THEME,
+            "themes": {name: dict(colors) for name, colors in DEFAULT_THEMES.items()},
+        }
+        config.update(DEFAULT_THEMES[DEFAULT_THEME])
+        if os.path.exists(self.CONFIG_FILE):
+            try:
+                with open(self.CONFIG_FILE, "r") as f:
+                    loaded = json.load(f)
+                for name, colors in loaded.get("themes", {}).items():
+                    if is_hex_color(colors.get("primary_color")) and is_hex_color(colors.get("off_color")):
+                        config["themes"][name] = {"primary_color": colors["primary_color"],
+                                                  "off_color": colors["off_color"]}
+                # Basic validation: Check that both keys exist and are strings.
+                if ("primary_color" in loaded and "off_color" in loaded and
+                        isinstance(loaded["primary_color"], str) and isinstance(loaded["off_color"], str)):
+                    config["primary_color"] = loaded["primary_color"]
+                    config["off_color"] = loaded["off_color"]
+                    config["theme"] = loaded.get("theme")  # None for custom colours
+            except Exception as e:
+                print("Error loading color configuration:", e)
+        return config
+
+    def save_color_config(self):
+        try:
+            with open(self.CONFIG_FILE, "w") as f:
+                json.dump(self.color_config, f, indent=4)
+        except Exception as e:
+            print("Error saving color configuration:", e)
+
+    def theme_names(self):
+        return list(self.color_config["themes"])
+
+    def stylesheet(self, primary=None, off=None):
+        """Return the cached stylesheet for the colours (default: the current ones)."""
+        key = (primary or self.color_config["primary_color"], off or self.color_config["off_color"])
+        style = self.stylesheets.get(key)
+        if style is None:
+            style = self.stylesheets[key] = build_stylesheet(*key)
+        return style
+
+    def apply(self, app=None):
+        """Set the current stylesheet on the application, one re-polish of every widget."""
+        app = app or QApplication.instance()
+        style = self.stylesheet()
+        if app is not None and style is not self.applied:
+            app.setStyleSheet(style)
+            self.applied = style
+
+    def set_theme(self, name):
+        """Switch to a named preset and apply it."""
+        colors = self.color_config["themes"][name]
+        self.set_colors(colors["primary_color"], colors["off_color"], name)
+
+    def set_colors(self, primary, off, theme=None):
+        self.color_config["primary_color"] = primary
+        self.color_config["off_color"] = off
+        self.color_config["theme"] = theme
+        self.save_color_config()
+        self.apply()
 
     def configure_color_scheme(self, widget, console_output):
+        # Pick a preset, or enter custom colours
+        names = self.theme_names() + [CUSTOM_THEME]
+        current = self.color_config.get("theme")
+        choice, ok = QInputDialog.getItem(
+            widget, "Color Theme", "Theme:", names,
+            names.index(current) if current in names else len(names) - 1, False
+        )
+        if not ok:
+            return
+        if choice != CUSTOM_THEME:
+            self.set_theme(choice)
+            console_output.append("Color scheme updated.")
+            return
+
         # Allow user to enter a new primary color.
         primary, ok1 = QInputDialog.getText(
-            widget, "Set Primary Color", 
+            widget, "Set Primary Color",
             "Enter primary color (hex, e.g., #4C721D):", text=self.color_config["primary_color"]
         )
         if not ok1 or not primary.strip():
             return
-        
+
         off, ok2 = QInputDialog.getText(
-            widget, "Set Off-Color", 
+            widget, "Set Off-Color",
             "Enter off-color (hex, e.g., #FFFFFF):", text=self.color_config["off_color"]
         )
         if not ok2 or not off.strip():
             return
 
         # Basic validation: ensure they start with '#' and have 7 characters.
-        if not (primary.startswith("#") and len(primary) == 7 and off.startswith("#") and len(off) == 7):
+        if not (is_hex_color(primary) and is_hex_color(off)):
             console_output.append("Error: Colors must be in hex format (e.g., #RRGGBB).")
             return
-        
-        self.color_config["primary_color"] = primary
-        self.color_config["off_color"] = off
-        self.save_color_config()
-        self.apply_color_scheme(widget)
-        console_output.append("Color scheme updated.")
\ No newline at end of file
+
+        self.set_colors(primary, off)
+        console_output.append("Color scheme updated.")
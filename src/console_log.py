@@ -0,0 +1,75 @@
+import threading
+from collections import deque
+
+# Message levels. A line is kept when its level is at most the log verbosity,
+# so the same constants double as the verbosity settings.
+ERRORS = 0  # errors and status messages, always kept
+IO = 1  # READ and WRITE results
+TRACE = 2  # every executed instruction
+
+VERBOSITY_NAMES = {ERRORS: "Errors only", IO: "I/O", TRACE: "Full trace"}
+
+
+class ConsoleLog:
+    """
+    Bounded console history shared by the execution worker and the GUI.
+    Lines go into a ring buffer of at most max_lines and into a pending
+    batch that the GUI flushes to its widget on a timer.
+
+    Verbosity filters lines when they are logged, not when they are shown:
+    callers check wants() so trace messages above it are never built. The
+    buffer, and so export(), therefore only holds lines logged at the
+    verbosity in effect at the time; raising it later does not bring back
+    a full trace of earlier steps.
+    """
+
+    def __init__(self, max_lines=10000, verbosity=TRACE):
+        self.max_lines = max_lines
+        self.verbosity = verbosity
+        self.lines = deque(maxlen=max_lines)
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def wants(self, level):
+        """True when a line of this level would be kept, so callers can skip building it."""
+        return level <= self.verbosity
+
+    def append(self, text, level=ERRORS):
+        if level > self.verbosity:
+            return
+        with self.lock:
+            self.lines.append(text)
+            self.pending.append(text)
+
+    def extend(self, lines, level=ERRORS):
+        if level > self.verbosity:
+            return
+        with self.lock:
+            self.lines.extend(lines)
+            self.pending.extend(lines)
+
+    def take_pending(self):
+        """Return the lines added since the previous call, oldest first."""
+        with self.lock:
+            pending = self.pending
+            self.pending = []
+        # A burst bigger than the buffer only needs its newest lines shown
+        return pending[-self.max_lines:]
+
+    def clear(self):
+        with self.lock:
+            self.lines.clear()
+            self.pending = []
+
+    def export(self, file_path):
+        """
+        Write every buffered line to file_path and return the number written.
+        Lines above the verbosity when they were logged were never kept and
+        are not in the export.
+        """
+        with self.lock:
+            lines = list(self.lines)
+        with open(file_path, 'w') as file:
+            for line in lines:
+                file.write(line + "\n")
+        return len(lines)
@@ -0,0 +1,92 @@
+STATE_BYTES = 100  # about one state table entry: a dict slot and its int key and step
+CELL_BYTES = 120  # about one (address, value) pair of a full state
+STATE_TABLE_BYTES = 8 * 1024 * 1024  # default bound on the state table
+
+
+class Cycle:
+    """A repeated VM state: the run would loop forever from here."""
+
+    def __init__(self, target, branch_address, first_step, repeat_step):
+        self.target = target  # address the back-edge jumps to
+        self.branch_address = branch_address  # address of the branch that jumps back
+        self.first_step = first_step  # step the state was first seen at
+        self.repeat_step = repeat_step  # step it was seen again at
+
+    @property
+    def period(self):
+        return self.repeat_step - self.first_step
+
+    def __str__(self):
+        return (f"Infinite loop detected: the state at address {self.target:03d} (branch back from "
+                f"{self.branch_address:03d}) repeats every {self.period} steps, first seen at step {self.first_step}.")
+
+
+class CycleDetector:
+    """
+    Exact detection of a run that can never end.
+
+    A run is deterministic apart from READ, so it loops forever once the
+    program counter, accumulator, number of values read and memory repeat.
+    Only cells written during the run can differ from the loaded program,
+    so the state covers just those cells, folded into a running hash that
+    each STORE and READ updates. States are compared only at back-edges
+    (taken branches to the same or an earlier address), which every loop
+    passes through, and the table keeps one hash per state. When a hash
+    comes back, its full state is kept with it, and the loop is reported
+    once that full state is reached again, so a hash collision never stops
+    a run. Each repeated hash keeps its own full state, which catches
+    loops that pass their back-edge in several states per period.
+    """
+
+    def __init__(self, max_bytes=STATE_TABLE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_states = max(1, max_bytes // STATE_BYTES)  # states kept before the table starts over
+        self.values = {}  # address written since the run started -> value folded into memory_hash
+        self.memory_hash = 0
+        self.reads = 0
+        self.seen = {}  # state hash -> step it was first seen at
+        self.states = {}  # state hash seen again -> (full state, step it was taken at)
+        self.state_bytes = 0  # estimated size of the full states
+        self.cycle = None
+
+    def state(self, vm):
+        """The full state compared when a hash repeats."""
+        memory = vm.memory.memory
+        return (vm.program_counter, vm.accumulator, self.reads,
+                tuple([(cell, memory[cell]) for cell in sorted(self.values)]))
+
+    def executed(self, vm, opcode, operand, address, step):
+        """
+        Note an executed instruction that started at address. Returns True
+        when it was a back-edge into a state seen before; self.cycle then
+        describes the loop.
+        """
+        if opcode == 21 or opcode == 10:
+            if opcode == 10:
+                self.reads += 1
+            value = vm.memory.memory[operand]
+            old = self.values.get(operand)
+            if old != value:
+                if old is not None:
+                    self.memory_hash ^= hash((operand, old))
+                self.memory_hash ^= hash((operand, value))
+                self.values[operand] = value
+        elif opcode in (40, 41, 42) and vm.program_counter <= address:
+            key = hash((vm.program_counter, vm.accumulator, self.reads, self.memory_hash))
+            first = self.seen.get(key)
+            if first is not None:
+                state = self.state(vm)
+                confirmed = self.states.get(key)
+                if confirmed is not None and confirmed[0] == state:
+                    self.cycle = Cycle(vm.program_counter, address, confirmed[1], step)
+                    return True
+                if self.state_bytes >= self.max_bytes:
+                    self.states.clear()
+                    self.state_bytes = 0
+                self.states[key] = (state, step)
+                self.state_bytes += STATE_BYTES + CELL_BYTES * len(self.values)
+                return False
+            if len(self.seen) >= self.max_states:
+                self.seen.clear()
+            self.seen[key] = step
+        return False
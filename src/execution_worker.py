@@ -0,0 +1,123 @@
+import queue
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from console_log import IO, TRACE
+from cycle_detection import CycleDetector
+
+
+class ExecutionWorker(QThread):
+    """
+    Runs the fetch/execute loop of a UVSim off the GUI thread. Trace lines go
+    to a ConsoleLog (only the levels it keeps are built), display refreshes
+    are throttled, READ values arrive through input_queue and cancel() stops
+    the loop between instructions. The run also stops at execution_limit
+    steps, after time_limit seconds (time spent waiting for input does not
+    count) or, with detect_cycles, as soon as its state repeats. A limit of
+    None means no limit. The uvsim's breakpoints and watchpoints stop it
+    too, except a breakpoint on the first instruction, so Run resumes.
+    """
+    progress = pyqtSignal()  # memory or registers changed, refresh the display
+    input_requested = pyqtSignal(int)  # READ needs a value for this address
+    run_finished = pyqtSignal(str)  # final status line
+
+    def __init__(self, uvsim, console_log, execution_limit=1000, emit_interval=1 / 30, parent=None,
+                 time_limit=None, detect_cycles=True):
+        super().__init__(parent)
+        self.uvsim = uvsim
+        self.console_log = console_log
+        self.execution_limit = execution_limit if execution_limit is not None else float("inf")
+        self.time_limit = time_limit  # seconds of running time, None for no limit
+        self.detect_cycles = detect_cycles
+        self.emit_interval = emit_interval  # seconds between display refreshes
+        self.input_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.last_emit = 0.0
+        self.deadline = None
+
+    def cancel(self):
+        """Ask the loop to stop before the next instruction."""
+        self.cancel_event.set()
+        self.input_queue.put(None)  # wake a READ that is waiting for input
+
+    def provide_input(self, value):
+        """Hand a READ value (or None when cancelled) to the running program."""
+        self.input_queue.put(value)
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if force or now - self.last_emit >= self.emit_interval:
+            self.progress.emit()
+            self.last_emit = now
+
+    def read_input(self, address):
+        self.flush(force=True)
+        self.input_requested.emit(address)
+        waiting_since = time.monotonic()
+        value = self.input_queue.get()
+        if self.deadline is not None:
+            self.deadline += time.monotonic() - waiting_since  # the user's time is not run time
+        if self.cancel_event.is_set():
+            return None
+        return value
+
+    def run(self):
+        uvsim = self.uvsim
+        log = self.console_log
+        step_count = 0
+        status = ""
+        continue_exec = True
+        self.last_emit = time.monotonic()
+        self.deadline = self.last_emit + self.time_limit if self.time_limit is not None else None
+        detector = CycleDetector() if self.detect_cycles else None
+        checking = bool(uvsim.breakpoints or uvsim.watchpoints)
+
+        while continue_exec and step_count < self.execution_limit:
+            if self.cancel_event.is_set():
+                status = "Program halted by user."
+                break
+            if checking and step_count and uvsim.breakpoint_hit(uvsim.program_counter):
+                status = f"Stopped at breakpoint {uvsim.program_counter:03d}."
+                break
+            try:
+                entry = uvsim.fetch()
+                word, opcode, operand = entry[0], entry[1], entry[2]
+                address = uvsim.program_counter
+                if log.wants(TRACE):
+                    log.append(f"Step {step_count + 1}: PC = {uvsim.program_counter:03d}, Opcode = {opcode}, Operand = {operand}", TRACE)
+
+                # Handle READ instruction separately (requires user input)
+                value = None
+                if opcode == 10:
+                    value = self.read_input(operand)
+                    if value is None:
+                        status = ("Program halted by user." if self.cancel_event.is_set()
+                                  else "Error: No input provided for READ instruction.")
+                        break
+
+                uvsim.instruction_register, uvsim.opcode, uvsim.operand = word, opcode, operand
+                continue_exec = uvsim.execute(entry, value)  # journaled, so the run can be stepped back
+                level = IO if opcode in (10, 11) else TRACE
+                if log.wants(level):
+                    log.append(uvsim.describe(opcode, operand), level)
+            except Exception as e:
+                status = f"Error executing instruction: {str(e)}"
+                break
+
+            step_count += 1
+            self.flush()
+            if continue_exec and checking and uvsim.watchpoint_hit(opcode, operand):
+                status = (f"Stopped after a write to watched address {operand:03d} "
+                          f"(now {uvsim.memory.get_value(operand)}).")
+                break
+            if continue_exec and detector is not None and detector.executed(uvsim, opcode, operand, address, step_count):
+                status = f"Execution halted: {detector.cycle}"
+                break
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                status = f"Execution halted after reaching the time limit of {self.time_limit:g} seconds."
+                break
+
+        if not status and continue_exec and step_count >= self.execution_limit:
+            status = "Execution halted due to reaching execution limit."
+        self.flush(force=True)
+        self.run_finished.emit(status)
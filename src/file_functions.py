@@ -1,38 +1,10 @@
 import os
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
+from program_parser import load_program_file
+from binary_format import write_program
 
-def detect_file_format(instructions):
-    """
-    Detect if a file contains 4-digit or 6-digit instructions.
-    
-    Args:
-        instructions: List of parsed integer instructions
-    
-    Returns:
-        str: "4-digit" or "6-digit" or None if empty list
-    """
-    if not instructions:
-        return None
-        
-    # Check the range of each instruction
-    four_digit_count = 0
-    six_digit_count = 0
-    
-    for instruction in instructions:
-        if -9999 <= instruction <= 9999:
-            four_digit_count += 1
-        if -999999 <= instruction <= 999999:
-            six_digit_count += 1
-    
-    # If all instructions fit in 4-digit range
-    if four_digit_count == len(instructions):
-        # Check if any instruction has 5 or 6 digits
-        for instruction in instructions:
-            if abs(instruction) >= 10000:
-                return "6-digit"
-        return "4-digit"
-    else:
-        return "6-digit"
+FILE_FILTER = "Text Files (*.txt);;UVSim Binary (*.uvsb);;All Files (*)"
+BINARY_EXTENSION = ".uvsb"
 
 def convert_4digit_to_6digit(instruction):
     """
@@ -51,90 +23,77 @@ def convert_4digit_to_6digit(instruction):
     # Convert to 6-digit format (opcode * 1000 + operand)
     return opcode * 1000 + operand
 
-def load_instruction_file(tab):
-    """Load instructions from a text file into memory."""
-    file_path, _ = QFileDialog.getOpenFileName(
-        tab, "Select Instructions File", "",
-        "Text Files (*.txt);;All Files (*)"
-    )
+def load_instruction_file(tab, file_path=None):
+    """Load instructions from file_path, or a file the user picks, into memory."""
+    if file_path is None:
+        file_path, _ = QFileDialog.getOpenFileName(
+            tab, "Select Instructions File", "", FILE_FILTER
+        )
     if not file_path:
         return
     tab.file_path = file_path
     try:
-        with open(file_path, 'r') as file:
-            instructions = []
-            for line in file:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    try:
-                        instruction = int(line)
-                        if -999999 <= instruction <= 999999:
-                            instructions.append(instruction)
-                        else:
-                            raise ValueError(f"Instruction {instruction} out of valid range (-999999 to 999999)")
-                    except ValueError as e:
-                        tab.console_output.append(f"Error parsing instruction: {line}")
-                        return
-            
-            # Detect file format
-            format_type = detect_file_format(instructions)
-            if not format_type:
-                tab.console_output.append("Empty file loaded.")
-                return
-                
-            tab.file_format = format_type  # Store the detected format
-            tab.console_output.append(f"Detected {format_type} instruction format")
-            
-            # If 4-digit format is detected, ask if user wants to convert to 6-digit
-            if format_type == "4-digit":
-                msg_box = QMessageBox()
-                msg_box.setWindowTitle("File Format Detected")
-                msg_box.setText(f"This appears to be a 4-digit format file. How would you like to proceed?")
-                msg_box.addButton("Keep as 4-digit", QMessageBox.AcceptRole)
-                convert_button = msg_box.addButton("Convert to 6-digit", QMessageBox.ActionRole)
-                msg_box.setDefaultButton(convert_button)
-                msg_box.exec_()
-                
-                if msg_box.clickedButton() == convert_button:
-                    # Convert to 6-digit format
-                    instructions = [convert_4digit_to_6digit(instr) for instr in instructions]
-                    tab.console_output.append("Converted instructions to 6-digit format")
-                    tab.file_format = "6-digit"  # Update format after conversion
+        program = load_program_file(file_path, tab.uvsim.memory.size)
+        for diagnostic in program.diagnostics:
+            tab.log(str(diagnostic))
+        if not program.ok:
+            return
+        instructions = list(program.words)
+
+        # Format comes from the binary or "# Format:" header, or is detected by the parser
+        format_type = program.format
+        format_from_header = program.format_from_header
+        confidence = program.format_confidence
+
+        if not instructions:
+            tab.log("Empty file loaded.")
+            return
+
+        tab.file_format = format_type  # Store the detected format
+        if format_from_header:
+            tab.log(f"Using {format_type} instruction format from file header")
+        else:
+            tab.log(f"Detected {format_type} instruction format ({confidence:.0%} confidence)")
+        
+        # If 4-digit format is detected, ask if user wants to convert to 6-digit
+        if format_type == "4-digit":
+            msg_box = QMessageBox()
+            msg_box.setWindowTitle("File Format Detected")
+            msg_box.setText(f"This appears to be a 4-digit format file. How would you like to proceed?")
+            msg_box.addButton("Keep as 4-digit", QMessageBox.AcceptRole)
+            convert_button = msg_box.addButton("Convert to 6-digit", QMessageBox.ActionRole)
+            msg_box.setDefaultButton(convert_button)
+            msg_box.exec_()
             
-            # Clear memory display
-            for label in tab.memory_labels:
-                label.setText("+000000")
-                
-            # Load instructions into memory display with appropriate formatting
-            for i, instruction in enumerate(instructions):
-                if i < 250:
-                    if tab.file_format == "4-digit":
-                        tab.memory_labels[i].setText(f"{instruction:+05d}")
-                    else:  # 6-digit
-                        tab.memory_labels[i].setText(f"{instruction:+07d}")
-                else:
-                    tab.console_output.append("Warning: Program exceeds memory size. Some instructions were not loaded.")
-                    break
-                    
-            tab.console_output.append(f"Successfully loaded {min(len(instructions), 250)} instructions from {os.path.basename(file_path)}")
+            if msg_box.clickedButton() == convert_button:
+                # Convert to 6-digit format
+                instructions = [convert_4digit_to_6digit(instr) for instr in instructions]
+                tab.log("Converted instructions to 6-digit format")
+                tab.file_format = "6-digit"  # Update format after conversion
+        
+        # Clear memory and load the instructions, the memory view formats them
+        tab.memory_model.set_format(tab.file_format)
+        tab.memory_model.format_fixed = True  # edits no longer change the format
+        size = tab.uvsim.memory.size
+        tab.memory_model.load_values(instructions[:size])
+        tab.format_inference.load(instructions)
+        tab.uvsim.memory.take_dirty()
+        tab.uvsim.set_format(tab.file_format)
+        tab.uvsim.reset(program.entry_point)  # nothing of the previous program's run carries over
+        tab.loaded_snapshot = tab.uvsim.snapshot()  # Reset returns here
+        tab.loaded_format_fixed = True
+        tab.displayed_format = tab.file_format
+
+        tab.log(f"Successfully loaded {min(len(instructions), size)} instructions from {os.path.basename(file_path)}")
     except Exception as e:
-        tab.console_output.append(f"Error loading file: {str(e)}")
+        tab.log(f"Error loading file: {str(e)}")
 
 def save_instruction_file(tab):
     """Save the current memory contents to a text file."""
     # Determine current format
     if not hasattr(tab, 'file_format'):
-        # If format not yet determined, try to detect from memory contents
-        instructions = []
-        for label in tab.memory_labels:
-            try:
-                value = int(label.text())
-                if value != 0:
-                    instructions.append(value)
-            except ValueError:
-                continue
-        
-        tab.file_format = detect_file_format(instructions) or "6-digit"  # Default to 6-digit if detection fails
+        # If format not yet determined, use the one inferred from memory contents
+        tab.file_format = tab.format_inference.format or "6-digit"  # Default to 6-digit if inference fails
     
     # Ask user if they want to save in a different format
     msg_box = QMessageBox()
@@ -161,8 +120,7 @@ def save_instruction_file(tab):
     # Ask for file path if needed
     if not tab.file_path:
         file_path, _ = QFileDialog.getSaveFileName(
-            tab, "Save Instructions File", "",
-            "Text Files (*.txt);;All Files (*)"
+            tab, "Save Instructions File", "", FILE_FILTER
         )
         if file_path:
             tab.file_path = file_path
@@ -172,38 +130,54 @@ def save_instruction_file(tab):
     if not file_path:
         return
         
+    if file_path.lower().endswith(BINARY_EXTENSION):
+        save_binary_file(tab, file_path, save_format)
+        return
+
     try:
         with open(file_path, 'w') as file:
             file.write("# UVSim Instructions File\n")
             file.write(f"# Format: {save_format}\n\n")
             instructions_written = 0
             
-            for i, label in enumerate(tab.memory_labels):
-                try:
-                    value = int(label.text())
-                    if value != 0:
-                        # If converting from 4 to 6 digit
-                        if tab.file_format == "4-digit" and save_format == "6-digit":
-                            value = convert_4digit_to_6digit(value)
-                            
-                        # Format based on save format
-                        if save_format == "4-digit":
-                            file.write(f"{value:+05d}\n")
-                        else:  # 6-digit
-                            file.write(f"{value:+07d}\n")
-                            
-                        instructions_written += 1
-                except ValueError:
-                    tab.console_output.append(f"Warning: Invalid value in memory location {i}, skipping...")
-                    continue
-                    
+            for value in tab.memory_model.values():
+                if value != 0:
+                    # If converting from 4 to 6 digit
+                    if tab.file_format == "4-digit" and save_format == "6-digit":
+                        value = convert_4digit_to_6digit(value)
+
+                    # Format based on save format
+                    if save_format == "4-digit":
+                        file.write(f"{value:+05d}\n")
+                    else:  # 6-digit
+                        file.write(f"{value:+07d}\n")
+
+                    instructions_written += 1
+
             # Update tab's format if converting
             if tab.file_format != save_format:
                 tab.file_format = save_format
+                tab.memory_model.set_format(save_format)
                 
-            tab.console_output.append(f"Successfully saved {instructions_written} instructions to {os.path.basename(file_path)} in {save_format} format")
+            tab.log(f"Successfully saved {instructions_written} instructions to {os.path.basename(file_path)} in {save_format} format")
     except Exception as e:
-        tab.console_output.append(f"Error saving file: {str(e)}")
+        tab.log(f"Error saving file: {str(e)}")
+
+def save_binary_file(tab, file_path, save_format):
+    """Save memory up to the last non-zero word as a binary program."""
+    words = tab.memory_model.values()
+    while words and words[-1] == 0:
+        words.pop()
+    if tab.file_format == "4-digit" and save_format == "6-digit":
+        words = [convert_4digit_to_6digit(value) for value in words]
+    try:
+        write_program(file_path, words, save_format)
+        if tab.file_format != save_format:
+            tab.file_format = save_format
+            tab.memory_model.set_format(save_format)
+        tab.log(f"Successfully saved {len(words)} words to {os.path.basename(file_path)} in binary {save_format} format")
+    except Exception as e:
+        tab.log(f"Error saving file: {str(e)}")
 
 def validate_instruction_format(tab):
     """
@@ -213,15 +187,8 @@ def validate_instruction_format(tab):
     if not hasattr(tab, 'file_format'):
         return True  # No format specified yet
         
-    instructions = []
-    for label in tab.memory_labels:
-        try:
-            value = int(label.text())
-            if value != 0:
-                instructions.append(value)
-        except ValueError:
-            continue
-            
+    instructions = [value for value in tab.memory_model.values() if value != 0]
+
     if not instructions:
         return True  # No instructions to validate
         
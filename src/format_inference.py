@@ -0,0 +1,91 @@
+"""
+Format inference for 4-digit vs 6-digit programs.
+
+A word outside -9999..9999 only fits the 6-digit format, so one such word
+settles it. Otherwise the program is read as 4-digit, with a confidence
+equal to the share of its non-zero words that decode to a valid 4-digit
+instruction. The file parser, the GUI tab and UVSim.load_program all use
+these rules. FormatInference keeps per-address counts so an edit to one
+cell updates the result without rescanning memory.
+"""
+from memory_structure import MEMORY_SIZE
+
+VALID_OPCODES = frozenset((10, 11, 20, 21, 30, 31, 32, 33, 40, 41, 42, 43))
+
+# Word classes counted by the inference
+ZERO, INSTRUCTION, NARROW, WIDE = range(4)
+
+
+def classify(word):
+    if word == 0:
+        return ZERO
+    if not -9999 <= word <= 9999:
+        return WIDE
+    return INSTRUCTION if word > 0 and word // 100 in VALID_OPCODES else NARROW
+
+
+class FormatGuess:
+    """Inferred format ("4-digit", "6-digit" or None for no non-zero words) and confidence from 0 to 1."""
+
+    def __init__(self, file_format, confidence):
+        self.format = file_format
+        self.confidence = confidence
+
+    def __str__(self):
+        if self.format is None:
+            return "unknown format"
+        return f"{self.format} format ({self.confidence:.0%} confidence)"
+
+    def __repr__(self):
+        return f"FormatGuess({self.format!r}, {self.confidence!r})"
+
+
+def guess_from_counts(counts):
+    if counts[WIDE]:
+        return FormatGuess("6-digit", 1.0)
+    nonzero = counts[INSTRUCTION] + counts[NARROW]
+    if not nonzero:
+        return FormatGuess(None, 0.0)
+    return FormatGuess("4-digit", counts[INSTRUCTION] / nonzero)
+
+
+def infer_format(words):
+    """Infer the format of words in a single pass."""
+    counts = [0, 0, 0, 0]
+    for word in words:
+        counts[classify(word)] += 1
+    return guess_from_counts(counts)
+
+
+class FormatInference:
+    """Format inference over a memory image that follows single-cell edits."""
+
+    def __init__(self, words=(), size=MEMORY_SIZE):
+        self.classes = bytearray(size)  # class of the word at each address
+        self.counts = [size, 0, 0, 0]
+        if words:
+            self.load(words)
+
+    def load(self, words):
+        """Classify a whole memory image in one pass, e.g. after a file was loaded."""
+        size = len(self.classes)
+        self.classes = bytearray(size)
+        self.counts = [size, 0, 0, 0]
+        for address, word in enumerate(words[:size]):
+            self.update(address, word)
+
+    def update(self, address, word):
+        """Account for the word now at address."""
+        new = classify(word)
+        old = self.classes[address]
+        if new != old:
+            self.counts[old] -= 1
+            self.counts[new] += 1
+            self.classes[address] = new
+
+    def result(self):
+        return guess_from_counts(self.counts)
+
+    @property
+    def format(self):
+        return self.result().format
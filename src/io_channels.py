@@ -0,0 +1,179 @@
+"""
+Input providers for READ and output sinks for WRITE.
+
+UVSim.run_until_halt and UVSim.run_async take any of these, or a plain
+source that make_input / make_output wrap:
+
+    inputs: a list or tuple, a file path (one value per line, blank lines
+            and '#' comments skipped), an iterator or generator, or an
+            asyncio.Queue (put None to signal the end of input)
+    output: a list the values are appended to, a file path or open text
+            file (one value per line), or a callable taking each value
+
+An input provider returns None from next_value() when no value is ready.
+The synchronous run then stops with "No input provided for READ
+instruction."; run_async awaits wait_value() instead, which only returns
+None once the input has ended.
+
+asyncio is only imported by code that uses it, since importing it costs
+more than the rest of the simulator.
+"""
+import os
+import sys
+from abc import ABC, abstractmethod
+
+
+class InputPending(ValueError):
+    """Raised by READ when its input provider has no value ready."""
+
+
+class InputProvider(ABC):
+    @abstractmethod
+    def next_value(self):
+        """Return the next READ value, or None when none is available now."""
+
+    async def wait_value(self):
+        """Return the next READ value, waiting for it if needed; None at the end of input."""
+        return self.next_value()
+
+
+class ListInput(InputProvider):
+    def __init__(self, values):
+        self.values = list(values)
+        self.position = 0
+
+    def next_value(self):
+        if self.position >= len(self.values):
+            return None
+        value = self.values[self.position]
+        self.position += 1
+        return value
+
+
+class IteratorInput(InputProvider):
+    """Values from an iterator or generator, taken one at a time."""
+
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+
+    def next_value(self):
+        return next(self.iterator, None)
+
+
+class FileInput(InputProvider):
+    """Values read lazily from a text file, one integer per line."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lines = None
+
+    def _values(self):
+        with open(self.file_path, 'r') as file:
+            for line_number, line in enumerate(file, start=1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    yield int(line)
+                except ValueError:
+                    raise ValueError(f"{self.file_path}: Line {line_number}: Invalid input value: {line}")
+
+    def next_value(self):
+        if self.lines is None:
+            self.lines = self._values()
+        return next(self.lines, None)
+
+
+class QueueInput(InputProvider):
+    """Values put on an asyncio.Queue by another task; a None item ends the input."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.closed = False
+
+    def next_value(self):
+        if self.closed:
+            return None
+        if self.queue.empty():
+            return None
+        value = self.queue.get_nowait()
+        if value is None:
+            self.closed = True
+        return value
+
+    async def wait_value(self):
+        if self.closed:
+            return None
+        value = await self.queue.get()
+        if value is None:
+            self.closed = True
+        return value
+
+
+class OutputSink(ABC):
+    @abstractmethod
+    def write(self, value):
+        """Take one value written by WRITE."""
+
+    def close(self):
+        pass
+
+
+class BufferOutput(OutputSink):
+    def __init__(self, values=None):
+        self.values = values if values is not None else []
+
+    def write(self, value):
+        self.values.append(value)
+
+
+class CallbackOutput(OutputSink):
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, value):
+        self.callback(value)
+
+
+class FileOutput(OutputSink):
+    """Writes one value per line to a file path (appended) or an open text file."""
+
+    def __init__(self, target):
+        self.owned = isinstance(target, (str, os.PathLike))
+        self.file = open(target, 'a') if self.owned else target
+
+    def write(self, value):
+        self.file.write(f"{value}\n")
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+def make_input(source):
+    """Wrap source in an InputProvider (None stays None)."""
+    if source is None or isinstance(source, InputProvider):
+        return source
+    asyncio = sys.modules.get("asyncio")  # an asyncio.Queue means asyncio is already imported
+    if asyncio is not None and isinstance(source, asyncio.Queue):
+        return QueueInput(source)
+    if isinstance(source, (str, os.PathLike)):
+        return FileInput(source)
+    if isinstance(source, (list, tuple)):
+        return ListInput(source)
+    return IteratorInput(source)
+
+
+def make_output(target):
+    """Wrap target in an OutputSink (None stays None)."""
+    if target is None or isinstance(target, OutputSink):
+        return target
+    if isinstance(target, list):
+        return BufferOutput(target)
+    if isinstance(target, (str, os.PathLike)) or hasattr(target, "write"):
+        return FileOutput(target)
+    if callable(target):
+        return CallbackOutput(target)
+    raise TypeError(f"Unsupported output target: {target!r}")
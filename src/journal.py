@@ -0,0 +1,77 @@
+from array import array
+
+from memory_structure import MEMORY_SIZE
+
+
+class ExecutionJournal:
+    """
+    Append-only record of executed instructions for reverse stepping.
+
+    Each step stores only what it changed: the program counter and
+    accumulator before it ran and the one memory cell it wrote (address -1
+    when it wrote none) with the cell's old value. The entries live in
+    fixed-size typed buffers, 16 bytes per step (20 for memories of over
+    32767 words), and once capacity steps are stored the oldest are
+    overwritten.
+    """
+
+    def __init__(self, capacity=10000, memory_size=MEMORY_SIZE):
+        if capacity < 1:
+            raise ValueError("Journal capacity must be at least 1.")
+        self.capacity = capacity
+        wide = memory_size > 32767  # addresses past the 16-bit buffers
+        self.program_counters = array('I' if wide else 'H', [0]) * capacity
+        self.accumulators = array('q', [0]) * capacity
+        self.addresses = array('i' if wide else 'h', [-1]) * capacity
+        self.old_values = array('i', [0]) * capacity
+        self.large_accumulators = {}  # slot -> accumulator too large for the 'q' buffer
+        self.end = 0  # slot the next step is written to
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def record(self, program_counter, accumulator, address=-1, old_value=0):
+        slot = self.end
+        self.program_counters[slot] = program_counter
+        try:
+            self.accumulators[slot] = accumulator
+            if self.large_accumulators:
+                self.large_accumulators.pop(slot, None)
+        except OverflowError:
+            self.accumulators[slot] = 0
+            self.large_accumulators[slot] = accumulator
+        self.addresses[slot] = address
+        self.old_values[slot] = old_value
+        self.end = (slot + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def pop(self):
+        """Remove the newest step and return (program counter, accumulator, address, old value)."""
+        if not self.count:
+            raise IndexError("The journal is empty.")
+        slot = (self.end - 1) % self.capacity
+        accumulator = self.large_accumulators.pop(slot, None)
+        if accumulator is None:
+            accumulator = self.accumulators[slot]
+        self.end = slot
+        self.count -= 1
+        return self.program_counters[slot], accumulator, self.addresses[slot], self.old_values[slot]
+
+    def steps_since_write(self, address):
+        """
+        Number of steps to undo to get back to just before the newest
+        recorded write to address, or None when no step in the journal wrote it.
+        """
+        slot = self.end
+        for distance in range(1, self.count + 1):
+            slot = (slot - 1) % self.capacity
+            if self.addresses[slot] == address:
+                return distance
+        return None
+
+    def clear(self):
+        self.end = 0
+        self.count = 0
+        self.large_accumulators.clear()
@@ -1,44 +1,433 @@
+from array import array
+
+MEMORY_SIZE = 250  # words in a default memory; other modules take the size from here
+MAX_MEMORY_SIZE = 10 ** 7  # largest size whose widened words still fit the 'i' buffer
+PAGE_SIZE = 25  # words per page of a memory snapshot
+SPARSE_THRESHOLD = 4096  # larger memories are paged unless asked otherwise
+SPARSE_PAGE_BITS = 10  # 1024 words per page of a sparse memory
+SPARSE_PAGE_SIZE = 1 << SPARSE_PAGE_BITS
+ZERO_PAGE = (array('i', [0]) * PAGE_SIZE).tobytes()  # shared by snapshots for unallocated sparse pages
+ZERO_VIEW = memoryview(ZERO_PAGE).cast('i')  # words of ZERO_PAGE, shared by copy-on-write memories
+
+
+def operand_divisor(size):
+    """
+    Divisor that splits a 6-digit-format word into opcode and operand. The
+    operand has three digits, or as many as the highest address needs.
+    """
+    return max(1000, 10 ** len(str(size - 1)))
+
+
+def format_divisor(file_format, size=MEMORY_SIZE):
+    """Divisor that splits a word of file_format into opcode and operand in a memory of size words."""
+    return 100 if file_format == "4-digit" else operand_divisor(size)
+
+
+def word_limit(size=MEMORY_SIZE):
+    """Largest word magnitude of a memory of size words: six digits, more once operands widen."""
+    return max(999999, 100 * operand_divisor(size) - 1)
+
+
+class PagedWords:
+    """
+    Word store for large memories that only allocates a page on its first
+    non-zero write; unallocated pages read as zeros. Indexing, slicing,
+    len() and iteration work like the dense array('i') buffer, and slices
+    are returned as array('i').
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.pages = {}  # page number -> array('i') of SPARSE_PAGE_SIZE words
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for start in range(0, self.size, SPARSE_PAGE_SIZE):
+            page = self.pages.get(start >> SPARSE_PAGE_BITS)
+            count = min(SPARSE_PAGE_SIZE, self.size - start)
+            if page is None:
+                yield from (0,) * count
+            else:
+                yield from page[:count]
+
+    def index(self, address):
+        if address < 0:
+            address += self.size
+        if not 0 <= address < self.size:
+            raise IndexError("array index out of range")
+        return address
+
+    def spans(self, start, stop):
+        """Split start..stop into (page number, first address, end address) runs within one page."""
+        while start < stop:
+            number = start >> SPARSE_PAGE_BITS
+            end = min(stop, (number + 1) << SPARSE_PAGE_BITS)
+            yield number, start, end
+            start = end
+
+    def __getitem__(self, address):
+        if isinstance(address, slice):
+            start, stop, step = address.indices(self.size)
+            if step != 1:
+                return array('i', (self[i] for i in range(start, stop, step)))
+            words = array('i', [0]) * max(0, stop - start)
+            for number, first, end in self.spans(start, stop):
+                page = self.pages.get(number)
+                if page is not None:
+                    offset = number << SPARSE_PAGE_BITS
+                    words[first - start:end - start] = page[first - offset:end - offset]
+            return words
+        address = self.index(address)
+        page = self.pages.get(address >> SPARSE_PAGE_BITS)
+        return 0 if page is None else page[address & (SPARSE_PAGE_SIZE - 1)]
+
+    def __setitem__(self, address, value):
+        if isinstance(address, slice):
+            start, stop, step = address.indices(self.size)
+            addresses = range(start, stop, step)
+            if len(value) != len(addresses):
+                raise ValueError("can only assign a sequence of the same length to a paged memory slice")
+            if step != 1:
+                for i, word in zip(addresses, value):
+                    self[i] = word
+                return
+            words = value if isinstance(value, array) and value.typecode == 'i' else array('i', value)
+            for number, first, end in self.spans(start, stop):
+                chunk = words[first - start:end - start]
+                page = self.pages.get(number)
+                if page is None:
+                    if not any(chunk):
+                        continue
+                    page = self.pages[number] = array('i', [0]) * SPARSE_PAGE_SIZE
+                offset = number << SPARSE_PAGE_BITS
+                page[first - offset:end - offset] = chunk
+            return
+        address = self.index(address)
+        number = address >> SPARSE_PAGE_BITS
+        page = self.pages.get(number)
+        if page is None:
+            if value == 0:
+                return  # already reads as zero
+            page = self.pages[number] = array('i', [0]) * SPARSE_PAGE_SIZE
+        page[address & (SPARSE_PAGE_SIZE - 1)] = value
+
+    def allocated_addresses(self):
+        """Addresses of the allocated pages, in order."""
+        for number in sorted(self.pages):
+            start = number << SPARSE_PAGE_BITS
+            yield from range(start, min(start + SPARSE_PAGE_SIZE, self.size))
+
+    def allocated_pages(self):
+        """Snapshot pages that overlap the allocated pages."""
+        pages = set()
+        for number in self.pages:
+            start = number << SPARSE_PAGE_BITS
+            end = min(start + SPARSE_PAGE_SIZE, self.size)
+            pages.update(range(start // PAGE_SIZE, (end - 1) // PAGE_SIZE + 1))
+        return pages
+
+
+class SharedPages:
+    """
+    Copy-on-write word store over the pages of a snapshot, used by forks.
+    Each page is read through a read-only view of the snapshot's bytes until
+    the first write to it copies that page into a private array('i'), so a
+    fork costs one reference per page and copies only the pages it writes.
+    Indexing, slicing, len() and iteration work like the array('i') buffer.
+    """
+
+    def __init__(self, size, pages):
+        self.size = size
+        self.pages = [ZERO_VIEW if page is ZERO_PAGE else memoryview(page).cast('i') for page in pages]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page
+
+    def index(self, address):
+        if address < 0:
+            address += self.size
+        if not 0 <= address < self.size:
+            raise IndexError("array index out of range")
+        return address
+
+    def __getitem__(self, address):
+        if isinstance(address, slice):
+            return array('i', (self[i] for i in range(*address.indices(self.size))))
+        address = self.index(address)
+        return self.pages[address // PAGE_SIZE][address % PAGE_SIZE]
+
+    def __setitem__(self, address, value):
+        if isinstance(address, slice):
+            addresses = range(*address.indices(self.size))
+            if len(value) != len(addresses):
+                raise ValueError("can only assign a sequence of the same length to a shared memory slice")
+            for i, word in zip(addresses, value):
+                self[i] = word
+            return
+        address = self.index(address)
+        number = address // PAGE_SIZE
+        page = self.pages[number]
+        if type(page) is memoryview:
+            page = self.pages[number] = array('i', page)  # first write, copy the page
+        page[address % PAGE_SIZE] = value
+
+    def allocated_pages(self):
+        """Pages that may hold a non-zero word."""
+        return {number for number, page in enumerate(self.pages) if page is not ZERO_VIEW}
+
+    def allocated_addresses(self):
+        for number in sorted(self.allocated_pages()):
+            start = number * PAGE_SIZE
+            yield from range(start, min(start + PAGE_SIZE, self.size))
+
+
+class DecodedCache(dict):
+    """Pre-decoded instructions of a sparse memory; addresses never decoded read as None."""
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def __missing__(self, address):
+        return None
+
+    def __len__(self):
+        return self.size
+
+
 class UVSimMemory:
-    def __init__(self):
-        """memory with 250 locations, set to zero."""
-        self.memory = [0] * 250  # array with 250 0's
+    def __init__(self, size=MEMORY_SIZE, sparse=None):
+        """
+        memory with size locations, set to zero. Memories larger than
+        SPARSE_THRESHOLD words (or any, with sparse=True) are paged.
+        """
+        if not 1 <= size <= MAX_MEMORY_SIZE:
+            raise ValueError(f"Memory size must be between 1 and {MAX_MEMORY_SIZE} words.")
+        if sparse is None:
+            sparse = size > SPARSE_THRESHOLD
+        self.size = size
+        self.sparse = sparse
+        self.operand_divisor = operand_divisor(size)  # of the 6-digit format
+        self.word_limit = word_limit(size)  # largest word magnitude
+        if sparse:
+            self.memory = PagedWords(size)
+            self.decoded = DecodedCache(size)  # pre-decoded instruction per address, filled in by UVSim
+        else:
+            self.memory = array('i', [0]) * size  # compact typed buffer of size 0's
+            self.decoded = [None] * size  # pre-decoded instruction per address, filled in by UVSim
+        self.dirty = set()  # addresses written since the last take_dirty()
+        self.write_hooks = []  # callables run with the address of every write, None for a bulk load
+        self.pages = None  # pages of the last snapshot taken or restored
+        self.written_pages = set()  # pages written since then
 
     def load_program(self, program):
         """
         Load a list of machine instructions (BasicML) into memory.
         """
-        if len(program) > 250:
-            raise ValueError("Program size exceeds available memory size of 250.")
+        count = len(program)
+        if count > self.size:
+            raise ValueError(f"Program size exceeds available memory size of {self.size}.")
 
-        for i, instruction in enumerate(program):
-            self.memory[i] = instruction
+        try:
+            if not isinstance(self.memory, array):
+                self.memory[:count] = program
+            elif isinstance(program, memoryview):
+                # e.g. a view into a memory-mapped binary corpus, copied without building ints
+                with memoryview(self.memory) as view:
+                    view[:count] = program
+            elif isinstance(program, array) and program.typecode == 'i':
+                self.memory[:count] = program
+            else:
+                self.memory[:count] = array('i', program)
+        except OverflowError:
+            raise ValueError("Program contains a value outside the memory word range.")
+        if self.sparse:
+            for address in range(count):
+                self.decoded.pop(address, None)
+        else:
+            self.decoded[:count] = [None] * count
+        self.dirty.update(range(count))
+        self.written_pages.update(range((count + PAGE_SIZE - 1) // PAGE_SIZE))
+        for hook in self.write_hooks:
+            hook(None)
 
     def get_value(self, address):
         """
         Retrieve the value stored at a given memory address.
         """
-        if 0 <= address < 250:
+        if 0 <= address < self.size:
             return self.memory[address]
         else:
-            raise IndexError("Memory address out of range 250.")
+            raise IndexError(f"Memory address out of range {self.size}.")
 
     def set_value(self, address, value):
         """
         Store a value in a specific memory address.
         """
-        if 0 <= address < 250:
-            if -999999 <= value <= 999999:  # Ensure value is within range
+        if 0 <= address < self.size:
+            if -self.word_limit <= value <= self.word_limit:  # Ensure value is within range
                 self.memory[address] = value
+                self.decoded[address] = None  # overwritten cell must be decoded again
+                self.dirty.add(address)
+                self.written_pages.add(address // PAGE_SIZE)
+                for hook in self.write_hooks:
+                    hook(address)
             else:
-                raise ValueError("Value must be a signed six-digit number (-999999 to +999999).")
+                raise ValueError(self.word_range_message())
         else:
             raise IndexError("Memory address out of range.")
 
+    def poke(self, address, value):
+        """
+        Fast write for an address that was already validated. The value is
+        still range checked since it comes from the accumulator.
+        """
+        if -self.word_limit <= value <= self.word_limit:
+            self.memory[address] = value
+            self.decoded[address] = None
+            self.dirty.add(address)
+            self.written_pages.add(address // PAGE_SIZE)
+            for hook in self.write_hooks:
+                hook(address)
+        else:
+            raise ValueError(self.word_range_message())
+
+    def word_range_message(self):
+        if self.word_limit == 999999:
+            return "Value must be a signed six-digit number (-999999 to +999999)."
+        return f"Value must be a signed number from -{self.word_limit} to +{self.word_limit}."
+
+    def used_addresses(self):
+        """Addresses that may hold a non-zero word: all of them, or a sparse memory's allocated pages."""
+        if self.sparse:
+            return self.memory.allocated_addresses()
+        return range(self.size)
+
+    def allocated_pages(self):
+        """Snapshot pages that overlap the allocated pages of a sparse memory."""
+        return self.memory.allocated_pages()
+
+    def share(self, pages):
+        """
+        Take the contents of snapshot pages without copying them: the words
+        are read from the pages and each page is copied on its first write.
+        """
+        old = self.memory
+        self.memory = SharedPages(self.size, pages)
+        self.clear_decoded()
+        if self.sparse:
+            self.dirty.update(old.allocated_addresses())
+            self.dirty.update(self.memory.allocated_addresses())
+        else:
+            self.dirty.update(range(self.size))
+        self.pages = pages
+        self.written_pages.clear()
+        for hook in self.write_hooks:
+            hook(None)
+
+    def snapshot(self):
+        """
+        Return the memory contents as a tuple of immutable pages. Pages not
+        written since the previous snapshot or restore are shared with it,
+        so only the written pages are copied.
+        """
+        page_count = (len(self.memory) + PAGE_SIZE - 1) // PAGE_SIZE
+        if self.pages is None and self.sparse:
+            # Unallocated ranges all share one zero page; the last page may be short
+            pages = [ZERO_PAGE] * page_count
+            written = self.allocated_pages()
+            if self.size % PAGE_SIZE:
+                written.add(page_count - 1)
+        elif self.pages is None:
+            pages = [None] * page_count
+            written = range(page_count)
+        else:
+            pages = list(self.pages)
+            written = self.written_pages
+        for page in written:
+            start = page * PAGE_SIZE
+            pages[page] = self.memory[start:start + PAGE_SIZE].tobytes()
+        self.pages = tuple(pages)
+        self.written_pages.clear()
+        return self.pages
+
+    def restore(self, pages):
+        """
+        Put back the contents of a snapshot. Only pages written since the last
+        snapshot or restore, or that differ from it, are compared and copied.
+        """
+        if self.pages is None and self.sparse:
+            # Copy every page except those that are zero in the snapshot and unallocated here
+            allocated = self.allocated_pages()
+            for address in self.used_addresses():
+                self.dirty.add(address)
+            for page, data in enumerate(pages):
+                if page in allocated or (data is not ZERO_PAGE and any(data)):
+                    start = page * PAGE_SIZE
+                    words = array('i', data)
+                    self.memory[start:start + len(words)] = words
+                    self.dirty.update(range(start, start + len(words)))
+            self.clear_decoded()
+            for hook in self.write_hooks:
+                hook(None)
+        elif self.pages is None:
+            # Nothing known about the current contents, copy everything
+            self.memory[:] = array('i', b"".join(pages))
+            self.clear_decoded()
+            self.dirty.update(range(len(self.memory)))
+            for hook in self.write_hooks:
+                hook(None)
+        else:
+            changed = set(self.written_pages)
+            changed.update(page for page, (old, new) in enumerate(zip(self.pages, pages)) if old is not new)
+            allocated = self.allocated_pages() if self.sparse else None
+            for page in changed:
+                if allocated is not None and page not in allocated and pages[page] is ZERO_PAGE:
+                    continue  # zero on both sides
+                start = page * PAGE_SIZE
+                words = array('i', pages[page])
+                if self.memory[start:start + len(words)] == words:
+                    continue
+                for address, value in enumerate(words, start):
+                    if self.memory[address] != value:
+                        self.memory[address] = value
+                        self.decoded[address] = None
+                        self.dirty.add(address)
+                        for hook in self.write_hooks:
+                            hook(address)
+        self.pages = pages
+        self.written_pages.clear()
+
+    def take_dirty(self):
+        """
+        Return the addresses written since the previous call and start tracking afresh.
+        The set is swapped rather than copied and cleared, so a write made by a
+        running worker thread meanwhile lands in one set or the other; writers
+        look up self.dirty on every write for this reason.
+        """
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def clear_decoded(self):
+        """
+        Drop every pre-decoded instruction, e.g. after the instruction format changes.
+        """
+        if self.sparse:
+            self.decoded.clear()  # in place, running loops hold a reference
+        else:
+            self.decoded[:] = [None] * self.size  # in place, running loops hold a reference
+
     def display_memory(self, start=0, end=99):
         """
         Print into console memory contents from a given range.
         """
-        for i in range(start, min(end + 1, 100)):
+        for i in range(start, min(end + 1, self.size)):
             print(f"Memory[{i:03d}] = {self.memory[i]:+07d}")
 
 
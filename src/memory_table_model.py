@@ -0,0 +1,171 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QColor, QIntValidator
+from PyQt5.QtWidgets import QLineEdit, QStyledItemDelegate
+
+INVALID_COLOR = QColor(255, 170, 170)
+
+
+class MemoryTableModel(QAbstractTableModel):
+    """
+    Table model that reads memory words straight from a UVSimMemory, so a
+    QTableView only formats the rows that are currently visible.
+    """
+    invalid_edit = pyqtSignal(int, str)  # address, message
+    cell_edited = pyqtSignal(int, int)  # address, new word
+
+    def __init__(self, memory, file_format="6-digit", parent=None):
+        super().__init__(parent)
+        self.memory = memory
+        self.file_format = file_format
+        self.format_fixed = False  # True when a loaded file set the format; otherwise edits may be 6-digit
+        self.heat_counts = None  # per-address execution counts shown as a heatmap
+        self.heat_max = 0
+        self.invalid_cells = {}  # address -> message of a rejected edit, until the cell is edited again
+        self.breakpoints = {}  # address -> condition, marked in the row header
+        self.watchpoints = set()  # watched addresses, marked in the row header
+
+    def set_format(self, file_format):
+        """Switch between 4-digit and 6-digit display of every word."""
+        if file_format != self.file_format:
+            self.file_format = file_format
+            self.refresh_all()
+
+    def edit_limit(self):
+        """Largest magnitude an edit may enter in the current format."""
+        return 9999 if self.file_format == "4-digit" and self.format_fixed else 999999
+
+    def format_value(self, value):
+        if self.file_format == "4-digit":
+            return f"{value:+05d}"
+        return f"{value:+07d}"  # 6-digit
+
+    def values(self):
+        """Return every memory word as a list."""
+        return list(self.memory.memory)
+
+    def load_values(self, values):
+        """Clear memory and copy values into it from address 0."""
+        self.beginResetModel()
+        values = list(values)
+        self.memory.load_program(values + [0] * (len(self.memory.memory) - len(values)))
+        self.invalid_cells.clear()
+        self.endResetModel()
+
+    def set_heat(self, counts):
+        """Colour each cell by its share of the largest count, or turn the heatmap off with None."""
+        self.heat_counts = counts
+        self.heat_max = max(counts) if counts is not None and len(counts) else 0
+        self.refresh_all()
+
+    def heat_color(self, address):
+        if not self.heat_max or address >= len(self.heat_counts) or not self.heat_counts[address]:
+            return None
+        heat = self.heat_counts[address] / self.heat_max
+        return QColor(255, int(235 - 170 * heat), int(200 - 200 * heat))  # pale orange to red
+
+    def set_markers(self, breakpoints, watchpoints):
+        """Mark the rows of a UVSim's breakpoints and watchpoints (kept by reference)."""
+        self.breakpoints = breakpoints
+        self.watchpoints = watchpoints
+        self.refresh_markers()
+
+    def refresh_markers(self):
+        """Redraw the row headers after breakpoints or watchpoints changed."""
+        if self.rowCount():
+            self.headerDataChanged.emit(Qt.Vertical, 0, self.rowCount() - 1)
+
+    def refresh_cells(self, addresses):
+        """Tell the view that the given addresses changed."""
+        if addresses:
+            self.dataChanged.emit(self.index(min(addresses), 0), self.index(max(addresses), 0))
+
+    def refresh_all(self):
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, 0))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.memory.memory)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.format_value(self.memory.get_value(index.row()))
+        if index.row() in self.invalid_cells:
+            if role == Qt.BackgroundRole:
+                return INVALID_COLOR
+            if role == Qt.ToolTipRole:
+                return self.invalid_cells[index.row()]
+        if self.heat_counts is not None:
+            if role == Qt.BackgroundRole:
+                return self.heat_color(index.row())
+            if role == Qt.ToolTipRole and index.row() < len(self.heat_counts):
+                return f"Executed {self.heat_counts[index.row()]} times"
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        address = index.row()
+        try:
+            word = int(str(value).strip())
+        except ValueError:
+            self.reject_edit(index, f"Error: Non-numeric value in memory[{address}]")
+            return False
+
+        # Validate against the current format, unless it is only inferred from the edits so far
+        limit = self.edit_limit()
+        if not -limit <= word <= limit:
+            self.reject_edit(index, f"Error: Invalid {self.file_format} instruction at memory[{address}]: {word}")
+            return False
+
+        self.invalid_cells.pop(address, None)
+        self.memory.set_value(address, word)
+        self.memory.dirty.discard(address)  # the view already shows the edit
+        self.dataChanged.emit(index, index)
+        self.cell_edited.emit(address, word)
+        return True
+
+    def reject_edit(self, index, message):
+        """Flag the cell of a rejected edit and report it; memory keeps its old word."""
+        self.invalid_cells[index.row()] = message
+        self.dataChanged.emit(index, index)
+        self.invalid_edit.emit(index.row(), message)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Vertical and role == Qt.ToolTipRole:
+            tips = []
+            if section in self.breakpoints:
+                condition = self.breakpoints[section]
+                tips.append(f"Breakpoint when {condition}" if condition is not None else "Breakpoint")
+            if section in self.watchpoints:
+                tips.append("Watchpoint: stops after a write")
+            return "\n".join(tips) or None
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            marker = ("B" if section in self.breakpoints else " ") + ("W" if section in self.watchpoints else " ")
+            return f"{marker} {section:03d}:" if marker.strip() else f"{section:03d}:"
+        return "Value"
+
+
+class MemoryItemDelegate(QStyledItemDelegate):
+    """Cell editor that only accepts signed integers within the model's edit limit while typing."""
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        limit = index.model().edit_limit()
+        editor.setValidator(QIntValidator(-limit, limit, editor))
+        return editor
@@ -68,7 +68,7 @@ class ControlOps:
 
     def branch(self, address):
         # Moves the program counter to the specified address
-        if not (0 <= address < 100):  # Validate memory address
+        if not (0 <= address < self.memory.size):  # Validate memory address
             raise IndexError("Memory address out of range.")
         return address
 
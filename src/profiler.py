@@ -0,0 +1,155 @@
+"""
+Execution profiler for UVSim.
+
+Attach one with UVSim.enable_profiler(); while it is attached every
+instruction goes through UVSim.execute(), which calls Profiler.record. With
+no profiler attached run_until_halt keeps its fast loops, so profiling
+costs nothing when it is off.
+
+Report for a program file from the command line:
+
+    python profiler.py program.txt --inputs 12 4 --max-steps 100000
+"""
+from array import array
+
+from memory_structure import MEMORY_SIZE
+
+OPCODE_NAMES = {
+    10: "READ", 11: "WRITE", 20: "LOAD", 21: "STORE",
+    30: "ADD", 31: "SUBTRACT", 32: "DIVIDE", 33: "MULTIPLY",
+    40: "BRANCH", 41: "BRANCHNEG", 42: "BRANCHZERO", 43: "HALT",
+}
+CONDITIONAL_BRANCHES = (41, 42)
+
+
+class Profiler:
+    def __init__(self, memory_size=MEMORY_SIZE):
+        self.address_counts = array('Q', [0]) * memory_size  # executions per address
+        self.opcode_counts = {}  # opcode -> executions
+        self.branch_counts = {}  # conditional branch address -> [taken, not taken]
+        self.back_edges = {}  # (target, branch address) -> times a branch jumped back
+        self.steps = 0
+
+    def record(self, address, opcode, next_address):
+        """Count one executed instruction; next_address is the program counter after it."""
+        self.steps += 1
+        self.address_counts[address] += 1
+        self.opcode_counts[opcode] = self.opcode_counts.get(opcode, 0) + 1
+        if opcode >= 40:
+            taken = next_address != address + 1
+            if opcode in CONDITIONAL_BRANCHES:
+                counts = self.branch_counts.get(address)
+                if counts is None:
+                    counts = self.branch_counts[address] = [0, 0]
+                counts[0 if taken else 1] += 1
+            if taken and opcode != 43 and next_address <= address:
+                edge = (next_address, address)
+                self.back_edges[edge] = self.back_edges.get(edge, 0) + 1
+
+    def reset(self):
+        for address in range(len(self.address_counts)):
+            self.address_counts[address] = 0
+        self.opcode_counts.clear()
+        self.branch_counts.clear()
+        self.back_edges.clear()
+        self.steps = 0
+
+    def hot_addresses(self, count=10):
+        """Return the count most executed addresses as (address, executions)."""
+        executed = [(address, hits) for address, hits in enumerate(self.address_counts) if hits]
+        executed.sort(key=lambda item: (-item[1], item[0]))
+        return executed[:count]
+
+    def branch_ratios(self):
+        """Return {address: (taken, not taken, fraction taken)} for conditional branches."""
+        return {
+            address: (taken, not_taken, taken / (taken + not_taken))
+            for address, (taken, not_taken) in sorted(self.branch_counts.items())
+        }
+
+    def loops(self):
+        """
+        Return the loops found from back-edges, hottest first, as dicts with
+        the start and end address, the iterations (times the back-edge was
+        taken) and the steps executed inside the loop body.
+        """
+        found = []
+        for (start, end), iterations in self.back_edges.items():
+            found.append({
+                "start": start,
+                "end": end,
+                "iterations": iterations,
+                "steps": sum(self.address_counts[start:end + 1]),
+            })
+        found.sort(key=lambda loop: (-loop["steps"], loop["start"]))
+        return found
+
+    def to_dict(self, top=10):
+        return {
+            "steps": self.steps,
+            "hot_addresses": [{"address": a, "count": c} for a, c in self.hot_addresses(top)],
+            "opcodes": {OPCODE_NAMES.get(op, str(op)): count for op, count in sorted(self.opcode_counts.items())},
+            "branches": {str(a): {"taken": t, "not_taken": n} for a, (t, n, _) in self.branch_ratios().items()},
+            "loops": self.loops(),
+        }
+
+    def report(self, top=10):
+        """Return a plain-text report of the profile."""
+        lines = [f"Instructions executed: {self.steps}", "", "Hot addresses:"]
+        for address, hits in self.hot_addresses(top):
+            share = hits / self.steps * 100 if self.steps else 0
+            lines.append(f"  {address:03d}  {hits:>10}  {share:5.1f}%")
+        lines += ["", "Opcodes:"]
+        for opcode, hits in sorted(self.opcode_counts.items(), key=lambda item: -item[1]):
+            lines.append(f"  {OPCODE_NAMES.get(opcode, opcode):<11}{hits:>10}")
+        ratios = self.branch_ratios()
+        if ratios:
+            lines += ["", "Conditional branches:"]
+            for address, (taken, not_taken, fraction) in ratios.items():
+                lines.append(f"  {address:03d}  taken {taken}, not taken {not_taken} ({fraction * 100:.0f}% taken)")
+        loops = self.loops()
+        if loops:
+            lines += ["", "Loops:"]
+            for loop in loops[:top]:
+                lines.append(f"  {loop['start']:03d}-{loop['end']:03d}  {loop['iterations']} iterations, "
+                             f"{loop['steps']} steps")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import contextlib
+    import io
+    import json
+    from UVSim import UVSim
+    from program_parser import load_program_file
+
+    parser = argparse.ArgumentParser(description="Profile a BasicML program.")
+    parser.add_argument("program", help="program file (.txt or .uvsb)")
+    parser.add_argument("--inputs", nargs="*", type=int, default=[], help="values for READ instructions")
+    parser.add_argument("--max-steps", type=int, default=100000, help="step limit")
+    parser.add_argument("--top", type=int, default=10, help="hot addresses and loops to list")
+    parser.add_argument("--json", help="also write the profile to this JSON file")
+    args = parser.parse_args()
+
+    program = load_program_file(args.program)
+    for diagnostic in program.diagnostics:
+        print(f"{args.program}: {diagnostic}")
+    if not program.ok:
+        raise SystemExit(1)
+    vm = UVSim()
+    vm.load_program(program.words, program.format)
+    vm.program_counter = program.entry_point
+    profiler = vm.enable_profiler()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = vm.run_until_halt(inputs=args.inputs, max_steps=args.max_steps)
+
+    print(profiler.report(args.top))
+    print()
+    if result.error:
+        print(f"Stopped by error: {result.error}")
+    elif not result.halted:
+        print(f"Stopped at the step limit of {args.max_steps}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(profiler.to_dict(args.top), f, indent=2)
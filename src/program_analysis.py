@@ -0,0 +1,214 @@
+"""
+Static control-flow analysis of BasicML programs.
+
+analyze_program decodes the words, follows every path from the entry point
+(both outcomes of each conditional branch) to build a control-flow graph,
+and marks words as code (reachable instructions) or data (LOAD/STORE/...
+operands). It reports reachable invalid words, branches and fall-throughs
+out of memory, branches into data, unreachable words and loops that can
+never reach HALT or any instruction that could stop the program with an
+error.
+
+Results are cached by a hash of the words, the format and the entry point,
+so the GUI and the batch runner can check a program before running it.
+"""
+import hashlib
+from array import array
+from collections import OrderedDict
+
+from memory_structure import MEMORY_SIZE, format_divisor
+
+MEMORY_OPCODES = (10, 11, 20, 21, 30, 31, 32, 33)
+BRANCH_OPCODES = (40, 41, 42)
+# Instructions that may stop a run: HALT, and the ones that can raise at run
+# time (READ without input, STORE of an out-of-range value, DIVIDE by zero)
+EXIT_OPCODES = (10, 21, 32, 43)
+CACHE_SIZE = 256
+
+
+class Finding:
+    """A problem found by the analysis, tied to a memory address."""
+
+    def __init__(self, address, message, severity="error"):
+        self.address = address
+        self.message = message
+        self.severity = severity  # "error" or "warning"
+
+    def __str__(self):
+        return f"Address {self.address:03d}: {self.message}"
+
+    def __repr__(self):
+        return f"Finding({self.address!r}, {self.message!r}, {self.severity!r})"
+
+
+class ProgramAnalysis:
+    def __init__(self, file_format, entry_point):
+        self.format = file_format
+        self.entry_point = entry_point
+        self.successors = {}  # reachable address -> addresses execution can continue at
+        self.code = set()  # reachable instruction addresses
+        self.data = set()  # addresses used as instruction operands
+        self.written = set()  # addresses READ or STORE can write
+        self.infinite_loops = []  # address lists that can never reach an exit
+        self.never_halts = False  # True when the entry point itself can never reach an exit
+        self.findings = []
+
+    @property
+    def errors(self):
+        return [f for f in self.findings if f.severity == "error"]
+
+    @property
+    def warnings(self):
+        return [f for f in self.findings if f.severity == "warning"]
+
+    @property
+    def self_modifying(self):
+        return bool(self.written & self.code)
+
+
+def format_ranges(addresses):
+    """Return sorted addresses as compact ranges, e.g. "005-007, 010"."""
+    ranges = []
+    for address in sorted(addresses):
+        if ranges and address == ranges[-1][1] + 1:
+            ranges[-1][1] = address
+        else:
+            ranges.append([address, address])
+    return ", ".join(f"{a:03d}" if a == b else f"{a:03d}-{b:03d}" for a, b in ranges)
+
+
+def _group(addresses, successors):
+    """Split addresses into groups connected by control flow."""
+    remaining = set(addresses)
+    groups = []
+    while remaining:
+        start = min(remaining)
+        group = {start}
+        pending = [start]
+        remaining.discard(start)
+        while pending:
+            address = pending.pop()
+            for other in list(remaining):
+                if other in successors.get(address, ()) or address in successors.get(other, ()):
+                    remaining.discard(other)
+                    group.add(other)
+                    pending.append(other)
+        groups.append(sorted(group))
+    return groups
+
+
+def analyze(words, file_format, entry_point=0, memory_size=MEMORY_SIZE):
+    """Analyze words (a program loaded from address 0 of a memory_size-word memory) without caching."""
+    divisor = format_divisor(file_format, memory_size)
+    memory = list(words[:memory_size]) + [0] * (memory_size - min(len(words), memory_size))
+    result = ProgramAnalysis(file_format, entry_point)
+    findings = result.findings
+
+    if not 0 <= entry_point < memory_size:
+        findings.append(Finding(entry_point, "Entry point is outside memory."))
+        return result
+
+    # Follow every path from the entry point
+    exits = set()
+    branch_targets = []
+    pending = [entry_point]
+    seen = {entry_point}
+    while pending:
+        address = pending.pop()
+        word = memory[address]
+        opcode, operand = word // divisor, word % divisor
+        successors = []
+        if word == 0:
+            findings.append(Finding(address, "Execution can reach an empty word."))
+            exits.add(address)
+        elif opcode in MEMORY_OPCODES:
+            if operand >= memory_size:
+                findings.append(Finding(address, f"Operand {operand} is outside memory."))
+                exits.add(address)
+            else:
+                result.data.add(operand)
+                if opcode in (10, 21):
+                    result.written.add(operand)
+                successors.append(address + 1)
+                if opcode in EXIT_OPCODES:
+                    exits.add(address)
+        elif opcode in BRANCH_OPCODES:
+            branch_targets.append((address, operand))
+            successors.append(operand)
+            if opcode != 40:
+                successors.append(address + 1)
+        elif opcode == 43:
+            exits.add(address)
+        else:
+            findings.append(Finding(address, f"Execution can reach an invalid instruction {word} (opcode {opcode})."))
+            exits.add(address)
+
+        result.successors[address] = []
+        for target in successors:
+            if target >= memory_size:
+                if opcode in BRANCH_OPCODES and target == operand:
+                    findings.append(Finding(address, f"Branch target {target} is outside memory."))
+                else:
+                    findings.append(Finding(address, "Execution runs past the end of memory."))
+                exits.add(address)
+                continue
+            result.successors[address].append(target)
+            if target not in seen:
+                seen.add(target)
+                pending.append(target)
+    result.code = seen
+
+    for address, target in branch_targets:
+        if target in result.data and target < memory_size:
+            findings.append(Finding(address, f"Branch jumps into data at {target:03d}.", "warning"))
+    if result.self_modifying:
+        findings.append(Finding(min(result.written & result.code),
+                                f"Program writes into its own code at {format_ranges(result.written & result.code)}; "
+                                "infinite loops are not checked.", "warning"))
+    else:
+        # Addresses that can reach an exit, walking the graph backwards
+        predecessors = {}
+        for address, targets in result.successors.items():
+            for target in targets:
+                predecessors.setdefault(target, []).append(address)
+        can_exit = set(exits)
+        pending = list(exits)
+        while pending:
+            for previous in predecessors.get(pending.pop(), ()):
+                if previous not in can_exit:
+                    can_exit.add(previous)
+                    pending.append(previous)
+        stuck = result.code - can_exit
+        if stuck:
+            result.infinite_loops = _group(stuck, result.successors)
+            result.never_halts = entry_point in stuck
+            for loop in result.infinite_loops:
+                findings.append(Finding(loop[0], f"Infinite loop: {format_ranges(loop)} can never reach HALT."))
+
+    unreachable = [a for a, word in enumerate(memory) if word and a not in result.code and a not in result.data]
+    if unreachable:
+        findings.append(Finding(unreachable[0], f"Unreachable words at {format_ranges(unreachable)}.", "warning"))
+    findings.sort(key=lambda f: (f.severity != "error", f.address))
+    return result
+
+
+_cache = OrderedDict()
+
+
+def program_hash(words, file_format, entry_point=0, memory_size=MEMORY_SIZE):
+    digest = hashlib.sha1(array('i', words).tobytes()).hexdigest()
+    return f"{digest}:{file_format}:{entry_point}:{memory_size}"
+
+
+def analyze_program(words, file_format, entry_point=0, memory_size=MEMORY_SIZE):
+    """Return the ProgramAnalysis for words, reusing the cached one for the same program."""
+    key = program_hash(words, file_format, entry_point, memory_size)
+    result = _cache.get(key)
+    if result is None:
+        result = analyze(words, file_format, entry_point, memory_size)
+        _cache[key] = result
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return result
@@ -0,0 +1,145 @@
+"""
+Qt-free parsing of BasicML instruction files.
+
+The parser streams lines from a file or any iterable of strings and collects
+every problem with its line number instead of stopping at the first one, so
+it can be used to bulk-validate files without the GUI.
+"""
+from array import array
+from format_inference import infer_format
+from memory_structure import MEMORY_SIZE, word_limit
+
+FORMATS = ("4-digit", "6-digit")
+
+
+class Diagnostic:
+    """A problem found while parsing, tied to a 1-based line number."""
+
+    def __init__(self, line_number, message, severity="error"):
+        self.line_number = line_number
+        self.message = message
+        self.severity = severity  # "error" or "warning"
+
+    def __str__(self):
+        return f"Line {self.line_number}: {self.message}"
+
+    def __repr__(self):
+        return f"Diagnostic({self.line_number!r}, {self.message!r}, {self.severity!r})"
+
+
+class ParsedProgram:
+    """Words of a parsed program, its format and the diagnostics found."""
+
+    def __init__(self):
+        self.words = array('i')  # typed buffer, can be handed to UVSimMemory.load_program
+        self.line_numbers = []  # source line of each word
+        self.format = None  # "4-digit", "6-digit" or None for an empty program
+        self.format_from_header = False  # True when a "# Format:" header set the format
+        self.format_confidence = 1.0  # confidence of an inferred format, see format_inference
+        self.entry_point = 0  # address execution starts at, only binary programs set it
+        self.diagnostics = []
+
+    @property
+    def errors(self):
+        return [d for d in self.diagnostics if d.severity == "error"]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def detect_file_format(instructions):
+    """
+    Detect if a file contains 4-digit or 6-digit instructions.
+
+    Args:
+        instructions: List of parsed integer instructions
+
+    Returns:
+        str: "4-digit" or "6-digit" or None if no instruction is non-zero
+    """
+    return infer_format(instructions).format
+
+
+def parse_header_format(line):
+    """Return the format named by a "# Format: ..." comment line, or None."""
+    text = line.lstrip('#').strip()
+    if text.lower().startswith("format:"):
+        value = text[len("format:"):].strip().lower()
+        if value in FORMATS:
+            return value
+    return None
+
+
+def parse_lines(lines, memory_size=MEMORY_SIZE):
+    """
+    Parse an iterable of text lines into a ParsedProgram for a memory of
+    memory_size words, whose size also sets the widest 6-digit word.
+
+    Blank lines and lines starting with '#' are skipped. A "# Format:" header
+    written by save_instruction_file fixes the format, so no detection runs.
+    """
+    program = ParsedProgram()
+    words = program.words
+    header_format = None
+    limits = {"4-digit": 9999, "6-digit": word_limit(memory_size)}
+    limit = limits["6-digit"]
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#'):
+            if header_format is None and not words:
+                header_format = parse_header_format(line)
+                if header_format is not None:
+                    limit = limits[header_format]
+            continue
+        try:
+            instruction = int(line)
+        except ValueError:
+            program.diagnostics.append(Diagnostic(line_number, f"Error parsing instruction: {line}"))
+            continue
+        if not -limit <= instruction <= limit:
+            program.diagnostics.append(Diagnostic(
+                line_number, f"Instruction {instruction} out of valid range (-{limit} to {limit})"))
+            continue
+        words.append(instruction)
+        program.line_numbers.append(line_number)
+
+    if len(words) > memory_size:
+        program.diagnostics.append(Diagnostic(
+            program.line_numbers[memory_size],
+            f"Program exceeds memory size of {memory_size}; later instructions will not be loaded.",
+            "warning"))
+
+    if header_format is not None:
+        program.format = header_format
+        program.format_from_header = True
+    else:
+        guess = infer_format(words)
+        program.format, program.format_confidence = guess.format, guess.confidence
+    return program
+
+
+def parse_file(file_path, memory_size=MEMORY_SIZE):
+    """Stream a program file from disk through parse_lines."""
+    with open(file_path, 'r') as file:
+        return parse_lines(file, memory_size)
+
+
+def load_program_file(file_path, memory_size=MEMORY_SIZE):
+    """
+    Read a text program, or a binary one when the path ends in .uvsb, into a
+    ParsedProgram. Binary programs carry their format in the header.
+    """
+    if file_path.lower().endswith(".uvsb"):
+        from binary_format import read_program
+        words, file_format, entry_point = read_program(file_path)
+        program = ParsedProgram()
+        program.words.extend(words)
+        program.format = file_format
+        program.format_from_header = True
+        program.entry_point = entry_point
+        return program
+    return parse_file(file_path, memory_size)
@@ -0,0 +1,56 @@
+"""
+Timing of GUI startup phases.
+
+UVSimGUI records importing PyQt5 and the simulator modules, creating the
+application and main window and building each tab's widgets, then prints a
+report once the first window is on screen when started with
+--startup-report (or UVSIM_STARTUP_REPORT=1 in the environment):
+
+    python UVSimGUI.py --startup-report
+"""
+import contextlib
+import time
+
+
+class StartupTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []  # (name, seconds of its own) in the order they finished
+        self.open_phases = []  # seconds spent in the children of each phase still running
+        self.finished_at = None  # seconds from start to the first window, once finish() ran
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Time the body of a with block as one phase, until finish() is called.
+        A phase nested in another only counts towards its own entry, so the
+        outer phase records its time less the nested ones.
+        """
+        began = time.perf_counter()
+        self.open_phases.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - began
+            children = self.open_phases.pop()
+            if self.open_phases:
+                self.open_phases[-1] += elapsed
+            if self.finished_at is None:
+                self.phases.append((name, elapsed - children))
+
+    def finish(self):
+        """Stop recording; the time since start is the time to the first window."""
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter() - self.start
+
+    def report(self):
+        total = self.finished_at if self.finished_at is not None else time.perf_counter() - self.start
+        lines = ["Startup timing:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<32}{seconds * 1000:9.1f} ms")
+        lines.append(f"  {'other':<32}{(total - sum(s for _, s in self.phases)) * 1000:9.1f} ms")
+        lines.append(f"  {'time to first window':<32}{total * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+
+timer = StartupTimer()  # shared by UVSimGUI and the tabs it builds
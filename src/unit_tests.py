@@ -2,6 +2,9 @@ import unittest
 from UVSim import UVSim
 from memory_structure import UVSimMemory
 from operations import InputOutputOps, LoadStoreOps, ArithmeticOps, ControlOps
+from console_log import ConsoleLog, ERRORS, IO, TRACE
+from program_parser import parse_lines
+import batch_engine
 
 class TestUVSim(unittest.TestCase):
     def setUp(self):
@@ -202,5 +205,659 @@ class TestUVSim(unittest.TestCase):
         accumulator = self.loadstore.load(7)
         self.assertEqual(accumulator, -999999)
 
+    # Pre-decoded instruction table
+    def test_load_program_predecodes_memory(self):
+        """Test that loading a program fills the decoded instruction table."""
+        self.uvsim.load_program([1007, 4300])
+        word, opcode, operand, handler = self.uvsim.memory.decoded[0]
+        self.assertEqual((word, opcode, operand), (1007, 10, 7))
+        self.assertIsNotNone(handler)
+
+    def test_set_value_invalidates_decoded_entry(self):
+        """Test that overwriting a cell drops its pre-decoded instruction."""
+        self.uvsim.load_program([2005, 2101, 4300, 0, 0, 4300])
+        self.uvsim.run()  # LOAD 05 (a HALT word) into the accumulator
+        self.uvsim.run()  # STORE it over address 01
+        self.assertIsNone(self.uvsim.memory.decoded[1])
+        self.uvsim.program_counter = 1
+        message, continue_exec = self.uvsim.run()
+        self.assertFalse(continue_exec)
+
+    # Headless run-to-halt
+    def test_run_until_halt_result(self):
+        """Test that run_until_halt returns accumulator, PC, outputs and step count."""
+        self.uvsim.load_program([1007, 1008, 2007, 3008, 2109, 1109, 4300])
+        result = self.uvsim.run_until_halt(inputs=[12, 30])
+        self.assertTrue(result.halted)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.accumulator, 42)
+        self.assertEqual(result.program_counter, 6)
+        self.assertEqual(result.outputs, [42])
+        self.assertEqual(result.steps, 7)
+        self.assertEqual(result.trace, [])
+
+    def test_run_until_halt_trace_and_limit(self):
+        """Test that trace messages appear only when tracing and max_steps stops loops."""
+        from UVSim import TRACE_FULL
+        self.uvsim.load_program([4000])  # BRANCH to itself forever
+        result = self.uvsim.run_until_halt(max_steps=5, trace_level=TRACE_FULL)
+        self.assertFalse(result.halted)
+        self.assertEqual(result.steps, 5)
+        self.assertEqual(result.trace[0], "BRANCH: Jumping to address 00")
+
+    def test_run_until_halt_missing_input(self):
+        """Test that a READ without input ends the run with an error."""
+        self.uvsim.load_program([1007, 4300])
+        result = self.uvsim.run_until_halt()
+        self.assertEqual(result.error, "No input provided for READ instruction.")
+        self.assertEqual(result.steps, 0)
+
+    # Array-backed memory with dirty tracking
+    def test_dirty_addresses_tracked(self):
+        """Test that writes are reported once by take_dirty."""
+        self.memory.load_program([1007, 4300])
+        self.memory.set_value(7, 12)
+        self.assertEqual(self.memory.take_dirty(), {0, 1, 7})
+        self.assertEqual(self.memory.take_dirty(), set())
+
+    def test_compiled_store_tracked_after_take_dirty(self):
+        """Test that compiled STOREs land in the set that replaced the one take_dirty returned."""
+        self.uvsim.load_program([20010, 21012, 21013, 43000, 0, 0, 0, 0, 0, 0, 5], "6-digit")
+        self.uvsim.use_compiler()
+        self.uvsim.memory.take_dirty()
+        self.uvsim.run_until_halt()
+        self.assertEqual(self.uvsim.memory.take_dirty(), {12, 13})
+
+    def test_fast_store_checks_value(self):
+        """Test that STORE through the fast path still rejects out-of-range values."""
+        self.uvsim.load_program([10005, 20005, 33005, 21006, 43000, 0])
+        result = self.uvsim.run_until_halt(inputs=[5000])
+        self.assertEqual(result.error, "Value must be a signed six-digit number (-999999 to +999999).")
+
+    # Bounded console log
+    def test_console_log_ring_buffer(self):
+        """Test that the console keeps at most max_lines and batches pending lines."""
+        log = ConsoleLog(max_lines=3)
+        for i in range(5):
+            log.append(f"line {i}")
+        self.assertEqual(list(log.lines), ["line 2", "line 3", "line 4"])
+        self.assertEqual(log.take_pending(), ["line 2", "line 3", "line 4"])
+        self.assertEqual(log.take_pending(), [])
+
+    def test_console_log_verbosity(self):
+        """Test that lines above the verbosity are dropped."""
+        log = ConsoleLog(verbosity=IO)
+        log.append("Error: something", ERRORS)
+        log.append("WRITE: Memory[7] = +0042", IO)
+        log.append("LOAD: Accumulator set to +0042", TRACE)
+        self.assertFalse(log.wants(TRACE))
+        self.assertEqual(list(log.lines), ["Error: something", "WRITE: Memory[7] = +0042"])
+
+    # Qt-free program parser
+    def test_parser_reports_all_bad_lines(self):
+        """Test that the parser keeps going and reports every bad line with its number."""
+        program = parse_lines(["+1007", "abc", "", "# comment", "12345678", "+4300"])
+        self.assertEqual(list(program.words), [1007, 4300])
+        self.assertEqual([d.line_number for d in program.errors], [2, 5])
+        self.assertFalse(program.ok)
+
+    def test_parser_uses_format_header(self):
+        """Test that a "# Format:" header skips detection."""
+        program = parse_lines(["# UVSim Instructions File", "# Format: 6-digit", "", "+001007", "+004300"])
+        self.assertEqual(program.format, "6-digit")
+        self.assertTrue(program.format_from_header)
+        self.assertEqual(parse_lines(["+1007", "+4300"]).format, "4-digit")
+
+    # Binary program corpus
+    def test_binary_corpus_round_trip(self):
+        """Test packing programs into a corpus and loading one through mmap."""
+        import os
+        import tempfile
+        from binary_format import write_corpus, ProgramCorpus
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.uvsb")
+            write_corpus(path, [([1007, 4300], "4-digit"), ([10005, 11005, 43000], "6-digit", 0)])
+            with ProgramCorpus(path) as corpus:
+                self.assertEqual(len(corpus), 2)
+                corpus.load_into(self.uvsim, 1, verify=True)
+            self.assertEqual(self.uvsim.format, "6-digit")
+            self.assertEqual(self.uvsim.memory.get_value(1), 11005)
+            result = self.uvsim.run_until_halt(inputs=[77])
+            self.assertEqual(result.outputs, [77])
+
+    def test_binary_corpus_load_clears_journal(self):
+        """Test that loading the next corpus program leaves nothing of the previous one to step back into."""
+        import os
+        import tempfile
+        from binary_format import write_corpus, ProgramCorpus
+        self.uvsim.enable_journal()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.uvsb")
+            write_corpus(path, [([2005, 2106, 4300, 0, 0, 7], "4-digit"), ([4300], "4-digit")])
+            with ProgramCorpus(path) as corpus:
+                corpus.load_into(self.uvsim, 0)
+                self.uvsim.run_until_halt()
+                corpus.load_into(self.uvsim, 1)
+        self.assertEqual(self.uvsim.step_back(), 0)
+
+    # Block compiler
+    def run_both_ways(self, program, file_format, max_steps=10000):
+        results = []
+        for compiled in (False, True):
+            uvsim = UVSim()
+            uvsim.set_format(file_format)
+            uvsim.memory.load_program(program)
+            uvsim.decode_program()
+            uvsim.use_compiler(compiled)
+            result = uvsim.run_until_halt(max_steps=max_steps)
+            results.append((result.steps, result.halted, result.error, result.accumulator,
+                            result.program_counter, result.outputs, list(uvsim.memory.memory)))
+        return results
+
+    def test_compiled_run_matches_interpreter(self):
+        """Test that compiled loops, including self-modifying code, give the interpreter's results."""
+        from benchmarks import WORKLOADS
+        for name, build in WORKLOADS.items():
+            for file_format in ("4-digit", "6-digit"):
+                for max_steps in (10000, 37):
+                    interpreted, compiled = self.run_both_ways(build(file_format, 200), file_format, max_steps)
+                    self.assertEqual(interpreted, compiled, f"{name} {file_format} {max_steps}")
+
+    def test_compiled_divide_by_zero(self):
+        """Test that a DIVIDE by zero inside a compiled block reports the interpreter's error."""
+        # LOAD 10, WRITE 10, DIVIDE 11 (zero), HALT
+        interpreted, compiled = self.run_both_ways([2010, 1110, 3211, 4300] + [0] * 6 + [8, 0], "4-digit")
+        self.assertEqual(interpreted, compiled)
+        self.assertEqual(compiled[2], "Attempt to divide by zero.")
+        self.assertEqual(compiled[0], 2)
+
+    def test_compiled_block_ends_before_halt(self):
+        """Test that a block stopping at a HALT hands the HALT to the interpreter."""
+        # READ 20, READ 21, LOAD 20, DIVIDE 21, STORE 22, WRITE 22, HALT
+        program = [1020, 1021, 2020, 3221, 2122, 1122, 4300]
+        self.uvsim.load_program(program)
+        self.uvsim.use_compiler()
+        result = self.uvsim.run_until_halt(inputs=[12, 4])
+        self.assertTrue(result.halted)
+        self.assertEqual((result.outputs, result.steps, result.program_counter), ([3], 7, 6))
+
+    # Lockstep batch execution
+    def test_run_batch_matches_uvsim(self):
+        """Test that each batch result matches running the input vector on its own UVSim."""
+        from batch_engine import run_batch
+        # READ 20, READ 21, LOAD 20, DIVIDE 21, STORE 22, WRITE 22, BRANCHNEG 8, HALT, WRITE 20, HALT
+        program = [1020, 1021, 2020, 3221, 2122, 1122, 4108, 4300, 1120, 4300]
+        inputs = [[12, 4], [-9, 2], [5, 0], [7], [20000, 1]]
+        results = run_batch(program, inputs)
+        self.assertEqual([r.outputs for r in results], [[3], [-5, -9], [], [], []])
+        self.assertEqual([r.halted for r in results], [True, True, False, False, False])
+        for values, result in zip(inputs, results):
+            uvsim = UVSim()
+            uvsim.load_program(program)
+            expected = uvsim.run_until_halt(inputs=values)
+            self.assertEqual((result.error, result.steps, result.accumulator, result.program_counter),
+                             (expected.error, expected.steps, expected.accumulator, expected.program_counter))
+
+    @unittest.skipUnless(batch_engine.np is not None, "NumPy is not installed")
+    def test_batch_engine_overflow_continues_on_uvsim(self):
+        """Test that an accumulator too large for int64 is finished by UVSim with exact ints."""
+        # LOAD 10, MULTIPLY 10 five times, HALT
+        program = [2010, 3310, 3310, 3310, 3310, 3310, 4300, 0, 0, 0, 999]
+        results = batch_engine.BatchEngine(program, [[], []], "4-digit").run()
+        self.assertEqual([r.accumulator for r in results], [999 ** 6, 999 ** 6])
+        self.assertTrue(all(r.halted for r in results))
+
+    # Process-pool batch runner
+    def test_batch_runner_streams_jsonl(self):
+        """Test that every program/input combination produces one JSON line."""
+        import json
+        import os
+        import tempfile
+        from batch_runner import run_all
+        with tempfile.TemporaryDirectory() as directory:
+            def write(name, lines):
+                path = os.path.join(directory, name)
+                with open(path, 'w') as file:
+                    file.write("\n".join(lines) + "\n")
+                return path
+            program = write("divide.txt", ["+1020", "+1021", "+2020", "+3221", "+2122", "+1122", "+4300"])
+            good = write("good.txt", ["12", "4"])
+            zero = write("zero.txt", ["5", "0"])
+            output = os.path.join(directory, "results.jsonl")
+            summary = run_all([program], [good, zero], output, workers=1)
+            with open(output) as file:
+                records = {os.path.basename(r["inputs"]): r for r in map(json.loads, file)}
+        self.assertEqual((summary["jobs"], summary["halted"], summary["error"]), (2, 1, 1))
+        self.assertEqual(records["good.txt"]["outputs"], [3])
+        self.assertEqual(records["zero.txt"]["error"], "Attempt to divide by zero.")
+
+    def test_batch_runner_survives_oversized_program(self):
+        """Test that a program longer than memory is truncated instead of aborting the batch."""
+        import os
+        import tempfile
+        from batch_runner import run_all
+        with tempfile.TemporaryDirectory() as directory:
+            big = os.path.join(directory, "big.txt")
+            with open(big, 'w') as file:
+                file.write("\n".join(["+4300"] + ["+0000"] * 259) + "\n")
+            ok = os.path.join(directory, "ok.txt")
+            with open(ok, 'w') as file:
+                file.write("+4300\n")
+            inputs = os.path.join(directory, "in.txt")
+            with open(inputs, 'w') as file:
+                file.write("1\n")
+            summary = run_all([big, ok], [inputs], os.path.join(directory, "out.jsonl"), workers=1)
+        self.assertEqual((summary["jobs"], summary["halted"]), (2, 2))
+
+    # Snapshot, restore and fork
+    def test_snapshot_shares_unwritten_pages(self):
+        """Test that a snapshot only copies pages written since the previous one."""
+        self.uvsim.load_program([1007, 2107, 1107, 4300])
+        first = self.uvsim.snapshot()
+        self.uvsim.memory.set_value(200, 42)
+        second = self.uvsim.snapshot()
+        self.assertIs(first.memory[0], second.memory[0])
+        self.assertIsNot(first.memory[8], second.memory[8])
+        self.uvsim.memory.take_dirty()
+        self.uvsim.restore(first)
+        self.assertEqual(self.uvsim.memory.get_value(200), 0)
+        self.assertEqual(self.uvsim.memory.take_dirty(), {200})
+
+    def test_fork_copies_only_written_pages(self):
+        """Test that a fork shares the parent's snapshot pages until it writes them."""
+        self.uvsim.load_program([1030, 1131, 4300])
+        self.uvsim.outputs.append(8)
+        child = self.uvsim.fork()
+        shared = child.memory.memory.pages
+        self.assertTrue(all(type(page) is memoryview for page in shared))
+        child.program_counter = 0
+        result = child.run_until_halt(inputs=[6])
+        self.assertEqual((result.outputs, child.outputs, self.uvsim.outputs), ([0], [8, 0], [8]))
+        self.assertEqual([number for number, page in enumerate(shared) if type(page) is not memoryview], [1])
+        self.assertEqual((child.memory.get_value(30), self.uvsim.memory.get_value(30)), (6, 0))
+
+    def test_fork_runs_independently(self):
+        """Test that forks from a shared prefix see different inputs without affecting each other."""
+        # READ 20, READ 21, LOAD 20, DIVIDE 21, STORE 22, WRITE 22, HALT
+        self.uvsim.load_program([1020, 1021, 2020, 3221, 2122, 1122, 4300])
+        self.uvsim.use_compiler()
+        self.uvsim.run_until_halt(inputs=[12], max_steps=1)
+        start = self.uvsim.snapshot()
+        results = [self.uvsim.fork().run_until_halt(inputs=[divisor]) for divisor in (4, 3, 0)]
+        self.assertEqual([r.outputs for r in results], [[3], [4], []])
+        self.assertEqual(results[2].error, "Attempt to divide by zero.")
+        self.uvsim.run_until_halt(inputs=[6])
+        self.assertEqual(self.uvsim.memory.get_value(22), 2)
+        self.uvsim.restore(start)
+        self.assertEqual((self.uvsim.program_counter, self.uvsim.memory.get_value(22)), (1, 0))
+
+    # Reverse stepping
+    def test_step_back_undoes_registers_memory_and_output(self):
+        """Test that stepping back restores the PC, accumulator, written cell and output."""
+        self.uvsim.enable_journal()
+        # READ 20, LOAD 20, ADD 20, STORE 20, WRITE 20, HALT
+        self.uvsim.load_program([1020, 2020, 3020, 2120, 1120, 4300])
+        result = self.uvsim.run_until_halt(inputs=[21])
+        self.assertEqual(result.outputs, [42])
+        self.assertEqual(self.uvsim.step_back(2), 2)
+        self.assertEqual((self.uvsim.program_counter, self.uvsim.accumulator), (4, 42))
+        self.assertEqual(self.uvsim.outputs, [])
+        self.assertEqual(self.uvsim.step_back_to_write(20), 1)
+        self.assertEqual((self.uvsim.program_counter, self.uvsim.memory.get_value(20)), (3, 21))
+        self.assertEqual(self.uvsim.step_back(10), 3)
+        self.assertEqual((self.uvsim.program_counter, self.uvsim.memory.get_value(20)), (0, 0))
+        self.assertEqual(self.uvsim.step_back(), 0)
+
+    def test_journal_is_bounded(self):
+        """Test that the journal keeps only the newest capacity steps."""
+        from journal import ExecutionJournal
+        journal = ExecutionJournal(capacity=3)
+        for step in range(5):
+            journal.record(step, 10 ** 30 if step == 4 else step, step if step % 2 else -1, 0)
+        self.assertEqual(len(journal), 3)
+        self.assertEqual(journal.steps_since_write(3), 2)
+        self.assertIsNone(journal.steps_since_write(1))
+        self.assertEqual([journal.pop()[:2] for _ in range(3)], [(4, 10 ** 30), (3, 3), (2, 2)])
+
+    def test_reset_clears_previous_run(self):
+        """Test that reset drops the registers, outputs and journal of the previous program."""
+        self.uvsim.enable_journal()
+        self.uvsim.load_program([2005, 1105, 4300, 0, 0, 9])
+        self.uvsim.program_counter = 0
+        self.uvsim.run_until_halt()
+        self.uvsim.memory.load_program([4300])
+        self.uvsim.reset(0)
+        self.assertEqual((self.uvsim.accumulator, self.uvsim.outputs, len(self.uvsim.journal)), (0, [], 0))
+        self.assertEqual(self.uvsim.step_back(), 0)
+
+    # Profiler
+    def test_profiler_counts_loop(self):
+        """Test per-address counts, opcode histogram, branch ratios and loop detection."""
+        from benchmarks import counting_loop
+        self.uvsim.load_program(counting_loop("4-digit", 5))
+        profiler = self.uvsim.enable_profiler()
+        result = self.uvsim.run_until_halt()
+        self.assertTrue(result.halted)
+        self.assertEqual(profiler.steps, result.steps)
+        self.assertEqual(profiler.address_counts[0], 5)
+        self.assertEqual(profiler.opcode_counts[40], 4)
+        self.assertEqual(profiler.branch_ratios()[3][:2], (1, 4))
+        self.assertEqual(profiler.loops(), [{"start": 0, "end": 4, "iterations": 4, "steps": 24}])
+        self.assertIn("Loops:", profiler.report())
+
+    def test_profiler_off_by_default(self):
+        """Test that no profile is kept unless it is enabled."""
+        self.uvsim.load_program([2007, 4300])
+        self.uvsim.run_until_halt()
+        self.assertIsNone(self.uvsim.profiler)
+
+    # Static control-flow analysis
+    def test_analysis_finds_infinite_loop_and_bad_targets(self):
+        """Test that loops without an exit, empty targets and unreachable words are reported."""
+        from program_analysis import analyze_program
+        # LOAD 10, BRANCHZERO 0, BRANCH 0, HALT (unreachable)
+        analysis = analyze_program([2010, 4200, 4000, 4300], "4-digit")
+        self.assertTrue(analysis.never_halts)
+        self.assertEqual(analysis.infinite_loops, [[0, 1, 2]])
+        self.assertEqual(analysis.code, {0, 1, 2})
+        self.assertIn("Unreachable words at 003", str(analysis.warnings[0]))
+        # READ 10, BRANCHNEG 20 (empty), HALT
+        analysis = analyze_program([1010, 4120, 4300], "4-digit")
+        self.assertFalse(analysis.never_halts)
+        self.assertEqual(analysis.data, {10})
+        self.assertEqual([f.address for f in analysis.errors], [20])
+        self.assertIs(analyze_program([1010, 4120, 4300], "4-digit"), analysis)  # cached by hash
+
+    def test_analysis_reads_vm_memory_directly(self):
+        """Test that the VM's memory array can be analyzed without copying it to a list."""
+        from program_analysis import analyze_program
+        self.uvsim.load_program([2010, 4200, 4000, 4300], "4-digit")
+        analysis = analyze_program(self.uvsim.memory.memory, "4-digit")
+        self.assertIs(analysis, analyze_program([2010, 4200, 4000, 4300] + [0] * 246, "4-digit"))
+        self.assertTrue(analysis.never_halts)
+
+    def test_analysis_skips_loops_in_self_modifying_code(self):
+        """Test that a program writing into its own code is not called an infinite loop."""
+        from program_analysis import analyze_program
+        from benchmarks import self_modifying
+        analysis = analyze_program(self_modifying("6-digit", 10), "6-digit")
+        self.assertTrue(analysis.self_modifying)
+        self.assertFalse(analysis.never_halts)
+        self.assertEqual(analysis.errors, [])
+
+    # Cycle detection and run budgets
+    def test_cycle_detection_confirms_hash_hits(self):
+        """Test that a repeated state hash only stops a run once the full state repeats."""
+        from cycle_detection import CycleDetector
+        detector = CycleDetector()
+        self.uvsim.load_program([4000])
+        self.uvsim.program_counter = 0
+        detector.seen[hash((0, 0, 0, 0))] = 1  # as if a different state had the same hash
+        self.assertFalse(detector.executed(self.uvsim, 40, 0, 0, 2))
+        self.assertIsNone(detector.cycle)
+        self.assertTrue(detector.executed(self.uvsim, 40, 0, 0, 3))
+        self.assertEqual((detector.cycle.first_step, detector.cycle.period), (2, 1))
+
+    def test_cycle_detection_nested_loop(self):
+        """Test that a loop passing its back-edges in several states per period is stopped."""
+        # Outer loop at 2 reloads an inner countdown from 10 that branches back to 2 forever
+        self.uvsim.load_program([2010, 2111, 2011, 3112, 2111, 4207, 4002, 4000, 0, 0, 3, 0, 1])
+        self.uvsim.program_counter = 0
+        result = self.uvsim.run_until_halt(max_steps=200000, detect_cycles=True)
+        self.assertIsNotNone(result.cycle)
+        self.assertLess(result.steps, 100)
+
+    def test_cycle_detection_alternating_accumulator(self):
+        """Test that a loop whose accumulator alternates between two values is stopped."""
+        # STORE 11, LOAD 12, SUBTRACT 11, BRANCH 0: the accumulator flips between 5 and -5
+        self.uvsim.load_program([2111, 2012, 3111, 4000])
+        self.uvsim.program_counter = 0
+        self.uvsim.accumulator = 5
+        result = self.uvsim.run_until_halt(max_steps=200000, detect_cycles=True)
+        self.assertIsNotNone(result.cycle)
+        self.assertEqual(result.cycle.period, 8)
+
+    def test_cycle_detection_stops_repeated_state(self):
+        """Test that a loop whose state repeats is stopped and reported."""
+        # LOAD 5, ADD 6, ADD 7, BRANCH 1 (adds 1 then -1 forever)
+        self.uvsim.load_program([2005, 3006, 3007, 4001, 0, 0, 1, -1])
+        result = self.uvsim.run_until_halt(max_steps=100000, detect_cycles=True)
+        self.assertFalse(result.halted)
+        self.assertEqual(result.steps, 10)  # the state at step 7 is confirmed one period later
+        self.assertEqual((result.cycle.target, result.cycle.branch_address, result.cycle.period), (1, 3, 3))
+        self.assertIn("Infinite loop detected", result.error)
+        # A counting loop changes state each pass and runs to HALT
+        self.uvsim.load_program([2010, 3111, 2110, 4205, 4000, 4300, 0, 0, 0, 0, 50, 1])
+        self.uvsim.program_counter = 0
+        result = self.uvsim.run_until_halt(max_steps=100000, detect_cycles=True)
+        self.assertTrue(result.halted)
+        self.assertIsNone(result.cycle)
+
+    def test_time_limit_stops_run(self):
+        """Test that the wall-clock budget stops a run that would use a huge step budget."""
+        self.uvsim.load_program([4000])
+        result = self.uvsim.run_until_halt(max_steps=10 ** 12, time_limit=0.05)
+        self.assertTrue(result.timed_out)
+        self.assertFalse(result.halted)
+        self.assertIn("Time limit", result.error)
+
+    # Breakpoints and watchpoints
+    def test_breakpoints_stop_and_resume(self):
+        """Test that address and accumulator breakpoints stop a run before their instruction."""
+        # LOAD 10, SUBTRACT 11, STORE 10, BRANCHZERO 5, BRANCH 0, HALT; counts 3 down to 0
+        self.uvsim.load_program([2010, 3111, 2110, 4205, 4000, 4300, 0, 0, 0, 0, 3, 1])
+        self.uvsim.program_counter = 0
+        self.uvsim.set_breakpoint(3, "acc == 1")
+        result = self.uvsim.run_until_halt()
+        self.assertEqual((result.breakpoint, result.steps, self.uvsim.accumulator), (3, 8, 1))
+        self.uvsim.clear_breakpoint(3)
+        self.uvsim.set_breakpoint(5)
+        result = self.uvsim.run_until_halt()  # resumes from 3 and stops before HALT
+        self.assertEqual(result.breakpoint, 5)
+        self.assertFalse(result.halted)
+        self.assertTrue(self.uvsim.run_until_halt().halted)  # a breakpoint on the first instruction is skipped
+        with self.assertRaises(ValueError):
+            self.uvsim.set_breakpoint(0, "acc ~ 3")
+
+    def test_watchpoint_stops_after_write(self):
+        """Test that a watchpoint stops the run right after its address is written."""
+        # READ 20, LOAD 20, ADD 20, STORE 21, HALT
+        self.uvsim.load_program([1020, 2020, 3020, 2121, 4300])
+        self.uvsim.program_counter = 0
+        self.uvsim.set_watchpoint(21)
+        result = self.uvsim.run_until_halt(inputs=[4])
+        self.assertEqual((result.watchpoint, self.uvsim.program_counter), (21, 4))
+        self.assertEqual(self.uvsim.memory.get_value(21), 8)
+        self.uvsim.clear_breakpoints()
+        self.assertEqual((self.uvsim.breakpoints, self.uvsim.watchpoints), ({}, set()))
+
+    # I/O channels
+    def test_io_channels_sources_and_sinks(self):
+        """Test that READ takes values from generators and files and WRITE reaches sinks."""
+        import os
+        import tempfile
+        # READ 20, WRITE 20, READ 20, WRITE 20, HALT
+        program = [1020, 1120, 1020, 1120, 4300]
+        seen = []
+        self.uvsim.load_program(program)
+        self.uvsim.program_counter = 0
+        result = self.uvsim.run_until_halt(inputs=(n * 7 for n in range(1, 3)), output=seen.append)
+        self.assertEqual((result.outputs, seen), ([7, 14], [7, 14]))
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "in.txt")
+            output_path = os.path.join(directory, "out.txt")
+            with open(input_path, "w") as f:
+                f.write("# values\n5\n\n-3\n")
+            self.uvsim.load_program(program)
+            self.uvsim.program_counter = 0
+            self.uvsim.run_until_halt(inputs=input_path, output=output_path)
+            with open(output_path) as f:
+                self.assertEqual(f.read(), "5\n-3\n")
+        self.uvsim.load_program(program)
+        self.uvsim.program_counter = 0
+        result = self.uvsim.run_until_halt(inputs=[1])
+        self.assertTrue(result.needs_input)
+        self.assertEqual(result.error, "No input provided for READ instruction.")
+
+    def test_io_channels_require_complete_subclasses(self):
+        """Test that a provider or sink missing its required method fails when created."""
+        from io_channels import InputProvider, OutputSink
+
+        class NoInput(InputProvider):
+            pass
+
+        class NoOutput(OutputSink):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoInput()
+        with self.assertRaises(TypeError):
+            NoOutput()
+
+    def test_run_async_awaits_input(self):
+        """Test that run_async waits on a queue for READ values instead of failing."""
+        import asyncio
+
+        async def drive():
+            # READ 20, LOAD 20, BRANCHZERO 6, WRITE 20, BRANCH 0, (empty), HALT
+            vms = []
+            for _ in range(2):
+                vm = UVSim()
+                vm.load_program([1020, 2020, 4206, 1120, 4000, 0, 4300])
+                vms.append(vm)
+            queues = [asyncio.Queue(), asyncio.Queue()]
+            tasks = [asyncio.ensure_future(vm.run_async(q)) for vm, q in zip(vms, queues)]
+            for value in (4, 9, 0):
+                for index, q in enumerate(queues):
+                    await q.put(value + index if value else 0)
+                await asyncio.sleep(0)
+            return await asyncio.gather(*tasks)
+
+        results = asyncio.run(drive())
+        self.assertEqual([r.outputs for r in results], [[4, 9], [5, 10]])
+        self.assertTrue(all(r.halted for r in results))
+
+    # Format inference
+    def test_format_inference_follows_edits(self):
+        """Test that one-cell edits update the inferred format and its confidence."""
+        from format_inference import FormatInference, infer_format
+        inference = FormatInference([1007, 2107, 1107, 4300, 5])
+        guess = inference.result()
+        self.assertEqual((guess.format, guess.confidence), ("4-digit", 0.8))
+        inference.update(4, 0)
+        self.assertEqual(inference.result().confidence, 1.0)
+        inference.update(2, 110007)
+        self.assertEqual(inference.format, "6-digit")
+        inference.update(2, 1107)
+        self.assertEqual(inference.format, "4-digit")
+        self.assertIsNone(infer_format([0, 0]).format)
+
+    def test_load_program_keeps_given_format(self):
+        """Test that a format passed to load_program is used instead of inferring one."""
+        # Data words fit both formats, so inference alone would pick 4-digit
+        self.uvsim.load_program([5, 7], "6-digit")
+        self.assertEqual(self.uvsim.format, "6-digit")
+        self.uvsim.load_program([2007, 4300])
+        self.assertEqual(self.uvsim.format, "4-digit")
+
+    # Startup timing
+    def test_startup_timer_records_until_finish(self):
+        """Test that phases are recorded until the first window is reported."""
+        from startup_timing import StartupTimer
+        timer = StartupTimer()
+        with timer.phase("import"):
+            pass
+        timer.finish()
+        with timer.phase("later tab"):
+            pass
+        self.assertEqual([name for name, _ in timer.phases], ["import"])
+        self.assertIn("time to first window", timer.report())
+
+    def test_startup_timer_counts_nested_phases_once(self):
+        """Test that an outer phase records its time without the phases nested in it."""
+        import time
+        from startup_timing import StartupTimer
+        timer = StartupTimer()
+        with timer.phase("window"):
+            with timer.phase("tab"):
+                time.sleep(0.02)
+        timer.finish()
+        phases = dict(timer.phases)
+        self.assertGreaterEqual(phases["tab"], 0.02)
+        self.assertLess(phases["window"], 0.02)
+        self.assertLessEqual(sum(phases.values()), timer.finished_at)
+
+    # Memory size
+    def test_large_memory_is_paged(self):
+        """Test that a large memory only allocates the pages written and widens 6-digit operands."""
+        vm = UVSim(memory_size=1000000)
+        word = 10 ** 6  # operands take six digits to reach address 999999
+        vm.load_program([20 * word + 999000, 30 * word + 999001, 21 * word + 999999,
+                         11 * word + 999999, 43 * word], "6-digit")
+        vm.memory.set_value(999000, 5)
+        vm.memory.set_value(999001, 37)
+        vm.use_compiler()
+        result = vm.run_until_halt()
+        self.assertTrue(result.halted)
+        self.assertEqual(result.outputs, [42])
+        self.assertEqual(sorted(vm.memory.memory.pages), [0, 975, 976])
+        self.assertEqual(vm.memory.memory[500000], 0)
+
+    def test_branch_checks_configured_memory_size(self):
+        """Test that BRANCH accepts any address of the configured memory and no further."""
+        control = ControlOps(UVSimMemory(500))
+        self.assertEqual(control.branch(300), 300)
+        with self.assertRaises(IndexError):
+            control.branch(500)
+
+    def test_fork_keeps_memory_size(self):
+        """Test that forks of a non-default and a sparse VM keep their size, operand width and store."""
+        vm = UVSim(memory_size=2000)
+        vm.load_program([21 * 10000 + 1500, 43 * 10000], "6-digit")
+        vm.accumulator = 9
+        child = vm.fork()
+        self.assertEqual((child.memory.size, child.memory.operand_divisor), (2000, 10000))
+        child.program_counter = 0
+        self.assertTrue(child.run_until_halt().halted)
+        self.assertEqual(child.memory.get_value(1500), 9)
+        sparse = UVSim(memory_size=1000000)
+        sparse.memory.set_value(999999, 4)
+        child = sparse.fork()
+        self.assertTrue(child.memory.sparse)
+        self.assertEqual(child.memory.memory.allocated_pages(), set(range(39976, 40000)))  # the parent's page 976
+        self.assertEqual(child.memory.get_value(999999), 4)
+        self.assertEqual(vm.memory.get_value(1500), 0)  # the parent kept its own memory
+
+    def test_sparse_snapshot_shares_zero_pages(self):
+        """Test that unallocated ranges of a sparse memory share one zero page in snapshots."""
+        from memory_structure import ZERO_PAGE
+        vm = UVSim(memory_size=100000)
+        vm.memory.set_value(50000, 6)
+        snapshot = vm.snapshot()
+        pages = snapshot.memory
+        self.assertEqual(sum(page is not ZERO_PAGE for page in pages), 42)  # 1024 words over 25-word pages
+        vm.memory.set_value(50000, 0)
+        vm.memory.set_value(70000, 1)
+        vm.restore(snapshot)
+        self.assertEqual((vm.memory.get_value(50000), vm.memory.get_value(70000)), (6, 0))
+
+    def test_analysis_parser_and_batch_use_memory_size(self):
+        """Test that analysis, parsing and batch runs take the operand width and bounds of a larger memory."""
+        from program_analysis import analyze_program
+        from program_parser import parse_lines
+        from batch_engine import run_batch
+        # READ 1500, WRITE 1500, HALT with four-digit operands
+        program = [10 * 10000 + 1500, 11 * 10000 + 1500, 43 * 10000]
+        analysis = analyze_program(program, "6-digit", memory_size=2000)
+        self.assertEqual(analysis.errors, [])
+        self.assertEqual(analysis.data, {1500})
+        parsed = parse_lines(["+101500", "+111500", "+430000"] * 1000, memory_size=2000)
+        self.assertEqual(parsed.diagnostics[-1].line_number, 2001)  # warns at the 2001st word, not the 251st
+        self.assertTrue(parse_lines(["+1199999"], memory_size=100000).ok)  # seven-digit words address 99999
+        self.assertFalse(parse_lines(["+1199999"]).ok)
+        results = run_batch(program, [[7], [-3]], file_format="6-digit", memory_size=2000)
+        self.assertEqual([result.outputs for result in results], [[7], [-3]])
+        self.assertTrue(all(result.halted for result in results))
+
 if __name__ == '__main__':
     unittest.main()